@@ -0,0 +1,179 @@
+from hashlib import blake2b, file_digest, sha256
+from os import O_CREAT, O_EXCL, O_WRONLY, chmod, close, getpid, open as os_open, replace, utime, write
+from pathlib import Path
+from tempfile import mkstemp
+from time import time
+
+from util.logging import ScopedLogger, get_logger
+
+
+def content_digest(filepath: Path) -> bytes:
+    with filepath.open('rb') as f:
+        return file_digest(f, lambda: blake2b(digest_size=16)).digest()
+
+
+class BuildCache:
+    """
+    The :class:`BuildCache` stores munge outputs by the content of their source files.
+    The key of an entry is the content digest of the source salted with everything else that changes
+    the output (tool version, platform, munge flags, ...). Unchanged sources are therefore restored
+    without parsing and building them again, no matter whether the registry knows them.
+
+    Entries are stored as `<directory>/<key[:2]>/<key>.<kind>`, where `kind` is the build extension
+    or the name of a parse artefact. A cache can be backed by a `shared` cache which is looked up on
+    a miss and receives every stored entry. Shared caches are used by several checkouts and processes
+    at once, so entries are written atomically and a hit refreshes the modification time of the entry,
+    which is used to evict the least recently used entries once the cache exceeds its `size`.
+    """
+
+    DIRECTORY = '.pymunge.build'
+    LOCK = '.lock'
+    LOCK_TIMEOUT = 60  # Seconds after which the lock of a crashed process is removed
+    MODE = 0o644  # Entries are readable by other users of a shared cache
+
+    def __init__(
+        self,
+        directory: Path,
+        salt: str = '',
+        size: int = 0,
+        shared: 'BuildCache' = None,
+        logger: ScopedLogger = get_logger(__name__)
+    ):
+        self.directory: Path = directory
+        self.salt: bytes = salt.encode()
+        self.size: int = size  # Maximum size in bytes, 0 for no limit
+        self.shared: BuildCache = shared
+        self.logger: ScopedLogger = logger
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, filepath: Path, digest: bytes | None = None) -> str:
+        """
+        Returns the cache key of a source file. The :func:`content_digest` of the file is computed if it is
+        not given, a munge computes it once and passes it to the registry and both caches.
+        """
+
+        key = sha256(self.salt)
+        key.update(b'\0')
+        key.update(digest or content_digest(filepath))
+        return key.hexdigest()
+
+    def entry(self, key: str, kind: str) -> Path:
+        return self.directory / key[:2] / f'{key}.{kind}'
+
+    def load(self, key: str, kind: str) -> bytes | None:
+        """
+        Returns the cached output or None if there is no entry. Entries found in the shared
+        cache are copied into this cache.
+        """
+
+        entry = self.entry(key, kind)
+
+        try:
+            data = entry.read_bytes()
+            utime(entry)
+        except OSError:
+            data = None
+
+        if data is not None:
+            self.logger.debug(f'Build cache hit: "{entry}"')
+
+        elif self.shared:
+            data = self.shared.load(key, kind)
+
+            if data is not None:
+                self.write(entry, data)
+
+        return data
+
+    def store(self, key: str, kind: str, data: bytes):
+        entry = self.entry(key, kind)
+        self.write(entry, data)
+
+        self.logger.debug(f'Build cache store: "{entry}"')
+
+        if self.shared:
+            self.shared.store(key, kind, data)
+
+    def write(self, entry: Path, data: bytes):
+        """
+        Writes an entry through a temporary file, readers never see a partially written entry.
+        """
+
+        entry.parent.mkdir(exist_ok=True)
+        descriptor, temporary = mkstemp(dir=entry.parent, prefix='.', suffix='.tmp')
+
+        try:
+            with open(descriptor, 'wb') as f:
+                f.write(data)
+            chmod(temporary, BuildCache.MODE)
+            replace(temporary, entry)
+
+        except OSError:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into its size.
+        Only one process evicts at a time, the others skip the eviction.
+        """
+
+        if self.shared:
+            self.shared.evict()
+
+        if not self.size or not self.lock():
+            return
+
+        try:
+            entries = []
+            total = 0
+
+            for entry in self.directory.glob('*/*'):
+                if entry.name.startswith('.'):
+                    continue
+
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                total += stat.st_size
+
+            entries.sort()
+
+            for _, size, entry in entries:
+                if total <= self.size:
+                    break
+
+                entry.unlink(missing_ok=True)
+                total -= size
+
+                self.logger.debug(f'Build cache evict: "{entry}"')
+
+        finally:
+            self.unlock()
+
+    def lock(self) -> bool:
+        lock = self.directory / BuildCache.LOCK
+
+        for _ in range(2):
+            try:
+                descriptor = os_open(lock, O_CREAT | O_EXCL | O_WRONLY)
+                write(descriptor, str(getpid()).encode())
+                close(descriptor)
+                return True
+
+            except FileExistsError:
+                try:
+                    if time() - lock.stat().st_mtime < BuildCache.LOCK_TIMEOUT:
+                        return False
+                    lock.unlink()
+                except FileNotFoundError:
+                    pass
+
+        return False
+
+    def unlock(self):
+        (self.directory / BuildCache.LOCK).unlink(missing_ok=True)
@@ -0,0 +1,107 @@
+import json
+import logging
+from contextlib import redirect_stderr, redirect_stdout
+from io import TextIOBase
+from os import chdir, getcwd
+from pathlib import Path
+from socket import socket
+from socketserver import StreamRequestHandler, UnixStreamServer
+
+from util.logging import ScopedLogger, get_logger
+
+
+class ClientStream(TextIOBase):
+    """
+    Text stream which forwards everything written to it as JSON lines to a client.
+    """
+
+    def __init__(self, connection: socket):
+        self.connection: socket = connection
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self.send({'out': text})
+        return len(text)
+
+    def send(self, message: dict):
+        try:
+            self.connection.sendall(json.dumps(message).encode() + b'\n')
+        except OSError:
+            pass  # The client went away, the request is finished anyway
+
+
+class ClientLogHandler(logging.Handler):
+    """
+    Logging handler which streams the formatted records of a request to the client.
+    """
+
+    def __init__(self, stream: ClientStream, level: str):
+        super().__init__(level.upper())
+        self.stream: ClientStream = stream
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class MungeDaemon(UnixStreamServer):
+    """
+    The :class:`MungeDaemon` serves munge and format requests over a Unix socket, so that the interpreter,
+    the imported modules and the loaded registries stay resident between calls.
+
+    A request is a single JSON line `{"argv": [...], "cwd": "..."}` with the command line of a pymunge call.
+    The output is streamed back as `{"out": "..."}` lines followed by `{"exit": <code>}`.
+    Requests are handled one after another because the :class:`MungeEnvironment` is a singleton.
+    """
+
+    def __init__(self, path: Path, execute: callable, logger: ScopedLogger = get_logger(__name__)):
+        self.path: Path = path
+        self.execute: callable = execute  # Called with (argv, stream) and returns the exit code
+        self.logger: ScopedLogger = logger
+
+        if path.exists():
+            path.unlink()
+
+        super().__init__(str(path), MungeDaemon.Handler)
+
+    class Handler(StreamRequestHandler):
+
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            request = json.loads(line)
+            stream = ClientStream(self.connection)
+            cwd = getcwd()
+
+            self.server.logger.info(f'Request: {" ".join(request["argv"])}')
+
+            try:
+                chdir(request.get('cwd', cwd))
+
+                with redirect_stdout(stream), redirect_stderr(stream):
+                    code = self.server.execute(request['argv'], stream)
+
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+
+            finally:
+                chdir(cwd)
+
+            stream.send({'exit': code})
+
+    def serve(self):
+        self.logger.info(f'Serving on "{self.path}"')
+
+        try:
+            self.serve_forever()
+
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
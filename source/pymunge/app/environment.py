@@ -1,28 +1,37 @@
 import pickle
+from argparse import Namespace
 
+from app.cache import BuildCache
 from app.registry import FileRegistry
+from app.trees import TreeCache
 from util.diagnostic import Diagnostic
-from util.logging import get_logger, ScopedLogger
+from util.logging import LogPipeline, get_logger, ScopedLogger
 from util.statistic import Statistic
+from version import STRING as VERSION
 
 
 class MungeEnvironment:
     """
     Singleton class which is initialized once in the :class:`Munger`.
-    Provides access to the :class:`Diagnostic`, :class:`ScopedLogger`,
-    :class:`Registry`, and :class:`Statistic`.
+    Provides access to the munge arguments, :class:`BuildCache`, :class:`Diagnostic`, :class:`ScopedLogger`,
+    :class:`Registry`, :class:`Statistic` and :class:`TreeCache`.
     """
 
+    Args: Namespace = None
+    Cache: BuildCache = None
     Diag: Diagnostic = None
     Log: ScopedLogger = None
     Reg: FileRegistry = None
     Stat: Statistic = None
+    Trees: TreeCache = None
 
-    def __init__(self, args, logger: ScopedLogger = get_logger(__name__)):
+    def __init__(self, args, logger: ScopedLogger = get_logger(__name__), registry: FileRegistry = None):
         self.logger: ScopedLogger = logger
-        self.diagnostic: Diagnostic = Diagnostic(logger=logger)
+        self.diagnostic: Diagnostic = Diagnostic(logger=logger, limit=args.diagnostic_limit)
         self.statistic: Statistic = Statistic()
 
+        if not MungeEnvironment.Args and args:
+            MungeEnvironment.Args = args
         if not MungeEnvironment.Diag and self.diagnostic:
             MungeEnvironment.Diag = self.diagnostic
         if not MungeEnvironment.Log and self.logger:
@@ -30,6 +39,14 @@ class MungeEnvironment:
         if not MungeEnvironment.Stat and self.statistic:
             MungeEnvironment.Stat = self.statistic
 
+        if args.run in ('format', 'munge') and not args.no_tree_cache:
+            # Array views and mapped input change the parsed trees
+            salt = f'{VERSION}|{args.arrays}|{args.input}'
+            self.trees: TreeCache = TreeCache(directory=args.tree_cache, salt=salt, logger=logger)
+
+            if not MungeEnvironment.Trees and self.trees:
+                MungeEnvironment.Trees = self.trees
+
         if args.run == 'cache':
             self.import_cache_file = args.cache.file
 
@@ -43,18 +60,65 @@ class MungeEnvironment:
             MungeEnvironment.Reg = self.registry
 
         elif args.run == 'munge':
-            self.registry: FileRegistry = FileRegistry(
+            self.registry: FileRegistry = registry or FileRegistry(
                 source=args.munge.source,
                 target=args.munge.target,
                 diagnostic=self.diagnostic,
                 logger=logger
             )
+            self.registry.diagnostic = self.diagnostic
 
             if not MungeEnvironment.Reg and self.registry:
                 MungeEnvironment.Reg = self.registry
 
+            if not args.munge.no_build_cache:
+                salt = MungeEnvironment.cache_salt(args)
+                shared = None
+
+                if args.munge.shared_cache:
+                    shared = BuildCache(
+                        directory=args.munge.shared_cache,
+                        salt=salt,
+                        size=args.munge.shared_cache_size,
+                        logger=logger
+                    )
+
+                self.cache: BuildCache = BuildCache(
+                    directory=args.munge.build_cache or args.munge.target / BuildCache.DIRECTORY,
+                    salt=salt,
+                    shared=shared,
+                    logger=logger
+                )
+
+                if not MungeEnvironment.Cache and self.cache:
+                    MungeEnvironment.Cache = self.cache
+
             self.export_cache_file = args.munge.cache_file
 
+    @staticmethod
+    def reset():
+        """
+        Releases the singletons so that a new :class:`MungeEnvironment` can take their place.
+        Used by worker processes, which set up their own environment once.
+        """
+
+        MungeEnvironment.Args = None
+        MungeEnvironment.Cache = None
+        MungeEnvironment.Diag = None
+        MungeEnvironment.Log = None
+        MungeEnvironment.Reg = None
+        MungeEnvironment.Stat = None
+        MungeEnvironment.Trees = None
+
+    @staticmethod
+    def cache_salt(args: Namespace) -> str:
+        """
+        Combines everything besides the source bytes that changes the munge output.
+        """
+
+        flags = ','.join(sorted(args.munge.flags or []))
+        return f'{VERSION}|{args.munge.platform}|{args.munge.mode}|{args.munge.game_version}|{flags}'
+
     def store_cache(self):
         pickle.dump({
             'diagnostic': self.diagnostic,
@@ -71,10 +135,16 @@ class MungeEnvironment:
         self.diagnostic = dump['diagnostic']
         self.statistic = dump['statistic']
 
+    def clear(self):
+        self.statistic.clear()
+        self.diagnostic.clear()
+
     def details(self):
+        LogPipeline.flush()
         self.statistic.details()
         self.diagnostic.details()
 
     def summary(self):
+        LogPipeline.flush()
         self.statistic.summary()
         self.diagnostic.summary()
@@ -1,14 +1,18 @@
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from inspect import stack
+from json import dumps, loads
 from multiprocessing import cpu_count as CPUS
+from os.path import relpath
 from pathlib import Path
-from queue import Empty
-from signal import Signals
+from signal import Signals, signal, SIGINT, SIG_IGN
 from sys import exit, exc_info
 from threading import Thread, Event
 from traceback import extract_tb
 
+from app.cache import content_digest
 from app.environment import MungeEnvironment as ENV
-from config import Run
+from config import Executor, Run
 from swbf.builders.odf import ClassBuilder
 from swbf.builders.msh import ModelBuilder
 from swbf.builders.builder import Ucfb
@@ -19,10 +23,12 @@ from swbf.parsers.cfg import CfgParser
 from swbf.parsers.fx import FxParser
 from swbf.parsers.msh import MshParser
 from swbf.parsers.odf import OdfParser
-from swbf.parsers.parser import Ext
+from swbf.parsers.parser import Ext, SwbfParser
 from swbf.parsers.req import ReqParser
 from swbf.parsers.sky import SkyParser
-from util.diagnostic import ErrorMessage
+from util.diagnostic import Diagnostic, ErrorMessage
+from util.logging import LogLevel, get_logger
+from util.time import measure
 
 
 def call_stack():
@@ -60,6 +66,16 @@ class Munger:
         Ext.Odf: OdfFormatter
     }
 
+    # Outputs of these types only depend on the source file and can be restored from the build cache.
+    # The links and diagnostics recorded while munging are restored from the LINKS and DIAGNOSTICS artefacts.
+    # REQ outputs are not cached, they depend on the files the request references.
+    CACHED = {
+        Ext.Msh,
+        Ext.Odf,
+    }
+    DIAGNOSTICS = 'diagnostics'
+    LINKS = 'links'
+
     PARSER = {
         Ext.Cfg: CfgParser,
         Ext.Fx: FxParser,
@@ -69,26 +85,60 @@ class Munger:
         Ext.Sky: SkyParser,
     }
 
-    StopEvent = Event()
+    StopEvent = Event()  # Stops the workers of the current run, e.g. after an error
+    InterruptEvent = Event()  # Stops the munger on a signal, including the following runs
+
+    def __init__(
+        self,
+        run: str,
+        *args,
+        jobs: int = max(1, CPUS() - 1),
+        executor: str = Executor.Thread,
+        resolve_dependencies: bool = False,
+        **kwargs
+    ):
+        Munger.run_type = run
 
-    def __init__(self, run: str, *args, **kwargs):
         if run == Run.Munge:
             Munger.process = Munger.munge
-            Munger.args = ENV.Reg.munge_dir
+            Munger.args = (ENV.Reg.munge_dir, )
         elif run == Run.Format:
             Munger.process = Munger.format
             Munger.args = args
+
+        self.jobs: int = max(1, jobs)
+        self.executor: str = executor
+        self.resolve_dependencies: bool = resolve_dependencies
         #self.ui: Process = Process(target=gui)
 
-    def run(self):
-        if ENV.Reg.munge_queue.qsize() == 0:
-            return
+    def run(self) -> bool:
+        """
+        Munges the scheduled files. Returns False if the run was stopped before all files were munged.
+        """
+
+        if not ENV.Reg.scheduler:
+            return True
+
+        # A previous run which was stopped does not stop this one
+        Munger.StopEvent.clear()
 
         #self.ui.start()
 
+        ENV.Reg.scheduler.start(Munger.PARSER.keys(), self.resolve_dependencies)
+
+        if self.executor == Executor.Process:
+            self.run_processes()
+        else:
+            self.run_threads()
+
+        #self.ui.join()
+
+        return not Munger.StopEvent.is_set()
+
+    def run_threads(self):
         threads = []
 
-        for _ in range(CPUS() - 1):
+        for _ in range(self.jobs):
             t = Thread(target=Munger.worker, args=Munger.args)
             threads.append(t)
             t.start()
@@ -96,43 +146,158 @@ class Munger:
         for t in threads:
             t.join()
 
-        #self.ui.join()
-    
+    def run_processes(self):
+        """
+        Munges the scheduled files in worker processes. Each worker process sends the results of a file
+        (diagnostics, statistics and registry updates) back, which are then merged into the environment.
+        """
+
+        scheduler = ENV.Reg.scheduler
+
+        # yapf: disable
+        executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=Munger.init_process,
+            initargs=(ENV.Args, Munger.run_type, Munger.args)
+        )
+        # yapf: enable
+
+        with executor:
+            futures = {}
+
+            while not scheduler.done and not Munger.StopEvent.is_set():
+                for file in scheduler.take():
+                    futures[executor.submit(Munger.process_file, file)] = file
+
+                if not futures:
+                    ENV.Log.error(f'No file can be munged, {len(scheduler)} files are still scheduled')
+                    break
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    file = futures.pop(future)
+
+                    try:
+                        Munger.merge(future.result())
+                        scheduler.complete(file)
+
+                    except Exception as e:
+                        ENV.Log.error(f'[{file}]: {e}')
+                        Munger.StopEvent.set()
+
+            if Munger.StopEvent.is_set():
+                scheduler.stop()
+                executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def init_process(args: Namespace, run: str, process_args: tuple):
+        # The main process handles interrupts and stops the pool
+        signal(SIGINT, SIG_IGN)
+
+        # The environment is set up once per worker, only the state of a file is cleared between files
+        ENV.reset()
+        ENV(args, get_logger('pymunge-worker', level=LogLevel.Critical))
+
+        Munger.run_type = run
+        Munger.process = Munger.munge if run == Run.Munge else Munger.format
+        Munger.args = process_args
+
+    @staticmethod
+    def process_file(file: Path) -> dict:
+        """
+        Munges a single file inside a worker process and returns everything the main process needs to merge.
+        """
+
+        ENV.Reg.clear()
+        ENV.Diag.clear()
+        ENV.Stat.clear()
+
+        ENV.Reg.register_file(file)
+
+        with ENV.Diag.scope(file), ENV.Diag.capture() as messages:
+            duration, _ = measure(Munger.process, file, *Munger.args)
+
+        return {
+            'file': file,
+            'duration': duration,
+            'diagnostic': messages,
+            'statistic': ENV.Stat.times,
+            'links': ENV.Reg.links(),
+            'munged': [(munged, ENV.Reg.registered_files[munged].digest) for munged in ENV.Reg.munged_files],
+        }
+
+    @staticmethod
+    def merge(result: dict):
+        for message in result['diagnostic']:
+            ENV.Diag.report(message)
+
+        ENV.Reg.record_diagnostics(result['file'], result['diagnostic'])
+
+        ENV.Stat.merge(result['statistic'])
+        ENV.Reg.unlink(result['file'])
+
+        for src, dst in result['links']:
+            ENV.Reg.add_link(src, dst)
+
+        for file, digest in result['munged']:
+            ENV.Reg.mark_munged(file, digest)
+
+        ENV.Reg.record_duration(result['file'], result['duration'])
+
     @staticmethod
     def handle_signal(signum, frame):
         ENV.Log.critical(f'Received signal {signum} ({Signals(signum).name})')
+        Munger.InterruptEvent.set()
         Munger.StopEvent.set()
+        if ENV.Reg:
+            ENV.Reg.scheduler.stop()
         exit(1)
 
     @staticmethod
     def worker(*args):
         while not Munger.StopEvent.is_set():
+            file = ENV.Reg.scheduler.get()
+            if file is None:
+                break
 
             try:
-                file = ENV.Reg.munge_queue.get(timeout=0.5)
-                if file:
-                    Munger.process(file, *args)
-
-            except Empty:
-                # TODO: Breaking the loop should only occur after munging is done 
-                break
+                with ENV.Diag.scope(file), ENV.Diag.capture() as messages:
+                    duration, _ = measure(Munger.process, file, *args)
+                ENV.Reg.record_diagnostics(file, messages)
+                ENV.Reg.record_duration(file, duration)
+                ENV.Reg.scheduler.complete(file)
 
             except Exception as e:
                 ENV.Log.error(f'[{call_stack()}]: {e}')
                 Munger.StopEvent.set()
+                ENV.Reg.scheduler.stop()
                 break
 
     @staticmethod
     def munge(file: Path, target: Path):
         ext = file.suffix[1:]
 
+        # The links of the previous munge are replaced by the links found now
+        ENV.Reg.unlink(file)
+
         if ext not in Munger.PARSER:
             ENV.Diag.report(ErrorMessage(f'File type "{ext}" not yet supported for parsing'))
             return
 
-        parser_type = Munger.PARSER[ext]
-        parser = parser_type(filepath=file, logger=ENV.Log)
-        tree = ENV.Stat.record('parse', str(parser.filepath), parser.parse)
+        # The content is hashed once for the registry and both caches
+        digest = content_digest(file)
+        cache_key = None
+
+        if ENV.Cache and ext in Munger.CACHED:
+            builder_type = Munger.BUILDER[ext]
+            build_file = target / (file.name + f'.{builder_type.Extension}')
+            cache_key = ENV.Cache.key(file, digest)
+
+            if Munger.restore(file, build_file, cache_key, builder_type.Extension, digest):
+                return
+
+        tree = Munger.parse(file, ext, digest)
 
         if ext not in Munger.BUILDER:
             ENV.Diag.report(ErrorMessage(f'File type "{ext}" not yet supported for building'))
@@ -140,21 +305,102 @@ class Munger:
 
         builder_type = Munger.BUILDER[ext]
         builder = builder_type(tree)
-        build_file_name = parser.filepath.name + f'.{builder.Extension}'
+        build_file_name = file.name + f'.{builder.Extension}'
         build_file = target / build_file_name
         ENV.Stat.record('build', str(build_file), builder.build)
 
         # Pack the built file into an ucfb
         ucfb = Ucfb(tree)
         ucfb.add(builder)
-        ucfb.data()
+        data = ucfb.data()
 
         with build_file.open('wb+') as f:
             ENV.Log.debug(f'Writing "{build_file}"')
-            f.write(ucfb.data())
+            f.write(data)
             #ENV.Reg.register_file(build_file) # TODO: register to build files
-        
-        ENV.Reg.mark_munged(file)
+
+        if cache_key:
+            ENV.Cache.store(cache_key, builder.Extension, data)
+            ENV.Cache.store(cache_key, Munger.LINKS, Munger.dump_links(file))
+            ENV.Cache.store(cache_key, Munger.DIAGNOSTICS, Diagnostic.dumps(ENV.Diag.captured()))
+
+        ENV.Reg.mark_munged(file, digest)
+
+    @staticmethod
+    def parse(file: Path, ext: str, digest: bytes | None = None) -> SwbfParser:
+        """
+        Parses a file or loads its tree from the tree cache. The links and diagnostics of a cached tree
+        are replayed as if the file was parsed.
+        """
+
+        parser_type = Munger.PARSER[ext]
+
+        if ENV.Trees:
+            key = ENV.Trees.key(file, digest)
+            time, cached = measure(ENV.Trees.load, key, file, parser_type, ENV.Log)
+
+            # Only trees which were restored are counted, misses are parsed and counted as such
+            if cached:
+                ENV.Stat.add('restore', str(file), time)
+                tree, links, messages = cached
+
+                for link in links:
+                    ENV.Reg.add_link(file, link)
+
+                for message in messages:
+                    ENV.Diag.report(message)
+
+                return tree
+
+        parser = parser_type(filepath=file, logger=ENV.Log)
+
+        with ENV.Diag.capture() as messages:
+            tree = ENV.Stat.record('parse', str(parser.filepath), parser.parse)
+
+        if ENV.Trees and tree.cacheable():
+            dependency = ENV.Reg.registered_files.get(file)
+            links = [link.filepath for link in dependency.children] if dependency else []
+            ENV.Trees.store(key, tree, links, messages)
+
+        return tree
+
+    @staticmethod
+    def restore(file: Path, build_file: Path, key: str, kind: str, digest: bytes | None = None) -> bool:
+        """
+        Writes the cached output of a source file without parsing and building it.
+        """
+
+        time, data = measure(ENV.Cache.load, key, kind)
+        links = ENV.Cache.load(key, Munger.LINKS)
+        messages = ENV.Cache.load(key, Munger.DIAGNOSTICS)
+
+        if data is None or links is None or messages is None:
+            return False
+
+        ENV.Stat.add('restore', str(build_file), time)
+
+        with build_file.open('wb+') as f:
+            ENV.Log.debug(f'Restoring "{build_file}"')
+            f.write(data)
+
+        for link in loads(links):
+            ENV.Reg.add_link(file, (file.parent / link).resolve())
+
+        for message in Diagnostic.loads(messages):
+            ENV.Diag.report(message)
+
+        ENV.Reg.mark_munged(file, digest)
+        return True
+
+    @staticmethod
+    def dump_links(file: Path) -> bytes:
+        """
+        Serializes the links recorded while parsing a file relative to its directory,
+        so that the entry can be restored in other checkouts.
+        """
+
+        dependency = ENV.Reg.registered_files[file]
+        return dumps([relpath(link.filepath, file.parent) for link in dependency.children]).encode()
 
     @staticmethod
     def format(file: Path, style: Path, check: bool = False):
@@ -164,9 +410,7 @@ class Munger:
             ENV.Diag.report(ErrorMessage(f'File type "{ext}" not yet supported for parsing'))
             return
 
-        parser_type = Munger.PARSER[ext]
-        parser = parser_type(filepath=file, logger=ENV.Log)
-        tree = ENV.Stat.record('parse', str(parser.filepath), parser.parse)
+        tree = Munger.parse(file, ext)
 
         if ext not in Munger.FORMATTER:
             ENV.Diag.report(ErrorMessage(f'File type "{ext}" not yet supported for formatting'))
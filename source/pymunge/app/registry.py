@@ -1,17 +1,43 @@
-import pickle
+from collections import deque
+from os import stat_result
 from pathlib import Path
-from queue import Queue
+from time import time_ns
 
 from parxel.nodes import Document
 
-from util.diagnostic import Diagnostic, ErrorMessage
+from app.cache import content_digest
+from app.scanner import SourceScanner
+from app.scheduler import MungeScheduler
+from app.store import DependencyStore
+from util.diagnostic import Diagnostic, DiagnosticMessage, ErrorMessage
 from util.logging import ScopedLogger, get_logger
+from util.sharded import ShardedDict
+
+
+def file_signature(stat: stat_result) -> tuple[int, int, int]:
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
 
 
 class BuildDependency(Document):
+    """
+    A registered file together with the state it had when it was munged the last time.
+    """
+
+    duration: int = 0  # Munge time of the last run in ns
+    digest: bytes = b''  # Content hash of the last munged state, empty if the file was not munged
+    recorded: int = 0  # Time in ns at which the state was recorded
+    signature: tuple[int, int, int] = (0, 0, 0)  # Size, mtime in ns and inode of the last munged state
+
     def __init__(self, filepath, parent = None, unmunged: bool = True):
         super().__init__(filepath, parent)
-        self.ts = 0 if unmunged else filepath.stat().st_mtime
+
+        if not unmunged:
+            self.record()
+
+    def record(self, digest: bytes | None = None):
+        self.signature = file_signature(self.filepath.stat())
+        self.digest = digest or content_digest(self.filepath)
+        self.recorded = time_ns()
 
 
 class FileRegistry:
@@ -26,10 +52,18 @@ class FileRegistry:
         def __init__(self, filepath: Path):
             super().__init__(f'Unresolved filepath {filepath}! Munge result may not work as expected.')
 
+    RACY_WINDOW = 2 * 10**9  # Timestamp granularity of common file systems in ns
+
     def __init__(self, source: Path, target: Path, diagnostic: Diagnostic, logger: ScopedLogger = get_logger(__name__)):
-        self.registered_files = {} # TODO: Maybe rename to source_files
-        self.munged_files = {}
-        self.munge_queue = Queue()
+        self.registered_files: ShardedDict = ShardedDict() # TODO: Maybe rename to source_files
+        self.munged_files: ShardedDict = ShardedDict()
+        self.scheduler = MungeScheduler(self)
+        self.store: DependencyStore = None
+        self.dirty: ShardedDict = ShardedDict()  # Files whose build information changed in this run
+        self.stats: dict[Path, stat_result] = {}  # Stat results of the scanned source files
+        self.dependents: ShardedDict = ShardedDict()  # Reverse links
+        self.diagnostics: ShardedDict = ShardedDict()  # Messages reported while munging a file in this run
+        self.relinked: ShardedDict = ShardedDict()  # Files whose links were replaced in this run
 
         self.diagnostic = diagnostic
         self.logger = logger
@@ -42,45 +76,224 @@ class FileRegistry:
         if not self.munge_dir.exists():
             self.munge_dir.mkdir(parents=True)
 
-    def collect_munge_files(self, source_filters):
+    def clear(self):
+        """
+        Forgets all files of this run. Worker processes clear their registry between files.
+        """
+
+        for files in [
+            self.registered_files, self.munged_files, self.dirty, self.dependents, self.diagnostics, self.relinked
+        ]:
+            for filepath in files.keys():
+                files.pop(filepath, None)
+
+        self.stats.clear()
+
+    def collect_munge_files(self, source_filters, jobs: int = 1):
         """
         Adds files based on the configured filter list to the munge queue.
         """
 
+        self.scheduler = MungeScheduler(self)
+        self.stats.clear()
+
         if self.source.is_dir():
+            buckets = SourceScanner(source_filters, jobs).scan(self.source)
+
             for source_filter in source_filters:
-                for entry in self.source.rglob(f'*.{source_filter}'):
+                for entry, stat in buckets[source_filter].items():
+                    self.stats[entry] = stat
                     self.register_file(entry)
 
         else:
             self.register_file(self.source)
 
-        for filepath, dependency in self.registered_files.items():
-            if Path(filepath).stat().st_mtime != dependency.ts:
-                self.munge_queue.put(filepath)
-                self.logger.debug(f'{filepath} is not up to date')
+        self.schedule(self.registered_files.keys())
+
+    def refresh(self, changed: dict[Path, stat_result], removed: list[Path], source_filters):
+        """
+        Updates the registry with the changes found by a :class:`SourceWatcher` and schedules the
+        changed files that are known or match the filter list with a new :class:`MungeScheduler`.
+        """
+
+        self.scheduler = MungeScheduler(self)
+
+        for filepath in removed:
+            self.forget(filepath)
+
+        self.stats.update(changed)
+        filepaths = []
+
+        for filepath in changed:
+            if filepath in self.registered_files or filepath.suffix[1:] in source_filters:
+                self.register_file(filepath)
+                filepaths.append(filepath)
+
+        self.schedule(filepaths)
+
+    def forget(self, filepath: Path):
+        """
+        Removes a deleted file. Its dependents are remunged, so that they report the missing file.
+        """
+
+        self.stats.pop(filepath, None)
+        dependency = self.registered_files.pop(filepath, None)
+
+        if dependency is None:
+            return
+
+        for dependent in self.invalidate([filepath])[1:]:
+            dependent_dep = self.registered_files[dependent]
+
+            with self.registered_files.lock(dependent):
+                if dependency in dependent_dep.children:
+                    dependent_dep.children.remove(dependency)
+
+            self.scheduler.add(dependent)
+
+        self.dependents.pop(filepath, None)
+        self.munged_files.pop(filepath, None)
+        self.dirty.pop(filepath, None)
+        self.relinked.pop(filepath, None)
+        self.diagnostics.pop(filepath, None)
+
+        if self.store:
+            self.store.remove(filepath)
+
+        self.logger.debug(f'{filepath} was removed')
+
+    def schedule(self, filepaths: list[Path]):
+        """
+        Adds the given files to the munge queue if they changed, together with their dependents.
+        """
+
+        changed = []
+
+        for filepath in filepaths:
+            if not self.is_up_to_date(filepath):
+                changed.append(filepath)
+                self.logger.debug('%s is not up to date', filepath)
             else:
-                self.logger.debug(f'{filepath} is up to date')
+                self.logger.debug('%s is up to date', filepath)
+                self.replay_diagnostics(filepath)
+
+        for filepath in self.invalidate(changed):
+            self.scheduler.add(filepath)
+
+    def invalidate(self, changed: list[Path]) -> list[Path]:
+        """
+        Returns the changed files followed by everything that (transitively) links to them.
+        The dependents lose their munged state, so they are remunged even if this run is interrupted.
+        """
+
+        affected = list(changed)
+        visited = set(changed)
+        queue = deque(changed)
+
+        while queue:
+            filepath = queue.popleft()
+
+            for dependent in self.dependents_of(filepath):
+                if dependent in visited or not self.stat_exists(dependent):
+                    continue
+
+                visited.add(dependent)
+                affected.append(dependent)
+                queue.append(dependent)
+
+                dependency = self.register_file(dependent)
+                dependency.digest = b''
+                self.munged_files[dependent] = False
+                self.dirty[dependent] = True
+
+                self.logger.debug('%s is invalidated by %s', dependent, filepath)
+
+        return affected
+
+    def dependents_of(self, filepath: Path) -> set[Path]:
+        """
+        Returns the files which link to a file in this or a previous run. Stored links of files
+        which were munged again in this run are outdated and ignored.
+        """
+
+        with self.dependents.lock(filepath):
+            dependents = set(self.dependents.get(filepath, ()))
+
+        if self.store:
+            dependents.update(src for src in self.store.dependents(filepath) if src not in self.relinked)
+
+        return dependents
+
+    def is_up_to_date(self, filepath: Path) -> bool:
+        """
+        Checks if a registered file did not change since it was munged the last time. Size, mtime and inode
+        are compared first and the content hash confirms a change.
+        """
+
+        dependency = self.registered_files.get(filepath)
+
+        if dependency is None or not dependency.digest:
+            return False
+
+        stat = self.stat(filepath)
+        signature = file_signature(stat)
+
+        # Files modified right before their state was recorded may change without a new mtime
+        racy = stat.st_mtime_ns >= dependency.recorded - FileRegistry.RACY_WINDOW
+
+        if signature == dependency.signature and not racy:
+            return True
+
+        if stat.st_size != dependency.signature[0] or content_digest(filepath) != dependency.digest:
+            return False
+
+        # Only the metadata changed (e.g. by a checkout), the next check can rely on the signature again
+        if signature != dependency.signature:
+            dependency.signature = signature
+            dependency.recorded = time_ns()
+            self.dirty[filepath] = True
+
+        return True
 
     def register_file(self, filepath: Path, unmunged: bool = True):
         """
         Adds a file path to the registry. A registered file can be referenced as dependency.
+        Concurrent registrations of the same file return the same :class:`BuildDependency`.
         """
 
-        # TODO: Must this be made thread-safe?
+        dependency = self.registered_files.get(filepath)
 
-        if not filepath.exists():
+        if dependency:
+            return dependency
+
+        if not self.stat_exists(filepath):
             self.diagnostic.report(FileRegistry.UnresolvedDependency(filepath))
+            return None
 
-        else:
-            dep = BuildDependency(filepath=filepath, unmunged=unmunged)
-            if filepath not in self.registered_files:
-                self.registered_files[filepath] = dep
-                self.logger.debug(f'Register file: {dep.filepath}')
-                # TODO: Add to munge queue if it matches the source_filters
-            return dep
+        # yapf: disable
+        dependency, created = self.registered_files.get_or_create(
+            filepath,
+            lambda path: BuildDependency(filepath=path, unmunged=unmunged)
+        )
+        # yapf: enable
+
+        if created:
+            self.logger.debug('Register file: %s', dependency.filepath)
+            self.load_file(dependency, unmunged)
+            # TODO: Add to munge queue if it matches the source_filters
+
+        return dependency
+
+    def stat(self, filepath: Path) -> stat_result:
+        """
+        Returns the stat result of the scan or queries it for files that were not scanned.
+        """
 
-        return None
+        stat = self.stats.get(filepath)
+        return stat if stat else Path(filepath).stat()
+
+    def stat_exists(self, filepath: Path) -> bool:
+        return filepath in self.stats or filepath.exists()
 
     def add_link(self, src: Path, dst: Path):
         """
@@ -89,64 +302,157 @@ class FileRegistry:
 
         src_dep = self.register_file(src)
         dst_dep = self.register_file(dst)
-        if src_dep and dst_dep:
+        if src_dep and dst_dep and self.link(src_dep, dst_dep):
+            self.dirty[src] = True
+
+    def link(self, src_dep: BuildDependency, dst_dep: BuildDependency) -> bool:
+        """
+        Adds a link and its reverse link unless it exists already.
+        """
+
+        with self.registered_files.lock(src_dep.filepath):
+            if dst_dep in src_dep.children:
+                return False
             src_dep.add(dst_dep)
 
-    def mark_munged(self, filepath: Path):
-        # TODO: Should be made thread-safe since file can be referenced more than once.
+        with self.dependents.lock(dst_dep.filepath):
+            self.dependents.setdefault(dst_dep.filepath, set()).add(src_dep.filepath)
+
+        return True
+
+    def unlink(self, filepath: Path):
+        """
+        Removes the links of a file before it is munged again, munging adds the links the file still has.
+        The stored links of the file are replaced when the build information is written.
+        """
+
+        dependency = self.registered_files.get(filepath)
+
+        if dependency is None:
+            return
+
+        with self.registered_files.lock(filepath):
+            children = list(dependency.children)
+            dependency.children.clear()
+
+        for child in children:
+            with self.dependents.lock(child.filepath):
+                self.dependents.get(child.filepath, set()).discard(filepath)
+
+        self.relinked[filepath] = True
+        self.dirty[filepath] = True
+
+    def links(self) -> list[tuple[Path, Path]]:
+        """
+        Returns all recorded links as (source, destination) file path pairs.
+        """
+
+        return [(src, dst.filepath) for src, dep in self.registered_files.items() for dst in list(dep.children)]
+
+    def mark_munged(self, filepath: Path, digest: bytes | None = None):
         self.munged_files[filepath] = True
-        self.registered_files[filepath].ts = Path(filepath).stat().st_mtime
+        self.registered_files[filepath].record(digest)
+        self.dirty[filepath] = True
+
+    def record_diagnostics(self, filepath: Path, messages: list[DiagnosticMessage]):
+        """
+        Stores the messages reported while munging a file. They are reported again whenever the file is skipped.
+        """
+
+        self.diagnostics[filepath] = list(messages)
+        self.dirty[filepath] = True
+
+    def replay_diagnostics(self, filepath: Path):
+        """
+        Reports the messages of the last munge of a skipped file.
+        """
+
+        messages = self.diagnostics.get(filepath)
+
+        if messages is None and self.store:
+            data = self.store.diagnostics(filepath)
+
+            try:
+                messages = Diagnostic.loads(data) if data else []
+            except (AttributeError, KeyError, TypeError, ValueError, EOFError) as e:
+                self.logger.debug(f'Could not decode the diagnostics of "{filepath}": {e}')
+                messages = []
+
+        with self.diagnostic.scope(filepath):
+            for message in messages or []:
+                self.diagnostic.report(message)
+
+    def record_duration(self, filepath: Path, duration: int):
+        """
+        Stores the munge time of a file. It is used to prioritize the file in future runs.
+        """
+
+        self.registered_files[filepath].duration = duration
+        self.dirty[filepath] = True
 
     def store_dependencies(self):
         """
-        Write build information for future runs.
+        Write the build information that changed during this run for future runs.
         """
 
-        if self.target.is_file():
-            graph_file_path = (self.target.parent / '.pymunge.graph')
-        else:
-            graph_file_path = (self.target / '.pymunge.graph')
+        if not self.store:
+            self.store = DependencyStore(self.graph_file_path(), self.source, self.target, self.logger)
+
+        files = []
+        links = []
+        diagnostics = []
+
+        for filepath in self.dirty.keys():
+            self.dirty.pop(filepath)
+            dependency = self.registered_files[filepath]
+            files.append((
+                filepath,
+                dependency.signature,
+                dependency.digest,
+                dependency.recorded,
+                dependency.duration,
+                self.munged_files.get(filepath, False),
+            ))
+            links.extend((filepath, child.filepath) for child in list(dependency.children))
 
-        with (graph_file_path).open('wb+') as graph_file:
-            pickle.dump({
-                'munged_files': self.munged_files,
-                'registered_files': self.registered_files,
-                'source': self.source,
-                'target': self.target,
-            }, graph_file)
+            if filepath in self.diagnostics:
+                diagnostics.append((filepath, Diagnostic.dumps(self.diagnostics[filepath])))
 
-            self.logger.info(f'Store dependency file: "{graph_file_path}"')
+        relinked = [filepath for filepath in self.relinked.keys() if self.relinked.pop(filepath, None)]
+        self.store.update(files, links, diagnostics, relinked)
+
+        self.logger.info(f'Store dependency file: "{self.store.filepath}" ({len(files)} changed files)')
 
     def load_dependencies(self):
         """
-        Load build information from previous run.
+        Opens the build information of previous runs. Files are loaded when they are registered.
         """
 
-        if self.target.is_file():
-            graph_file_path = (self.target.parent / '.pymunge.graph')
-        else:
-            graph_file_path = (self.target / '.pymunge.graph')
+        self.store = DependencyStore(self.graph_file_path(), self.source, self.target, self.logger)
+        self.logger.info(f'Load dependency file: "{self.store.filepath}"')
 
-        if graph_file_path.exists():
-            self.logger.info(f'Load dependency file: "{graph_file_path}"')
+    def graph_file_path(self) -> Path:
+        if self.target.is_file():
+            return self.target.parent / DependencyStore.FILE
+        return self.target / DependencyStore.FILE
 
-            graph_file = pickle.load(graph_file_path.open('rb'))
-            source = graph_file['source']
-            target = graph_file['target']
+    def load_file(self, dependency: BuildDependency, unmunged: bool = True):
+        """
+        Restores the state and the links of a newly registered file from the build information of previous runs.
+        """
 
-            if source == self.source and target == self.target:
-                self.munged_files = graph_file['munged_files']
-                self.registered_files = graph_file['registered_files']
+        filepath = dependency.filepath
+        entry = self.store.file(filepath) if self.store else None
 
-                for filepath, registered_file in self.registered_files.items():
-                    file = Path(filepath)
+        if entry:
+            if unmunged:
+                dependency.signature, dependency.digest, dependency.recorded = entry[:3]
+            dependency.duration = entry[3]
+            self.munged_files[filepath] = entry[4]
 
-                    if file.exists():
-                        # File needs remunging
-                        if file.stat().st_mtime != registered_file.ts:
-                            registered_file.ts = 0
-                            if filepath in self.munged_files:
-                                self.munged_files[filepath] = False
+            for link in self.store.links(filepath):
+                if link.exists():
+                    self.link(dependency, self.register_file(link))
 
-                    else:
-                        del self.registered_files[file]
+        else:
+            self.dirty[filepath] = True
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import DirEntry, scandir, stat_result
+from pathlib import Path
+
+
+Buckets = dict[str, dict[Path, stat_result]]
+
+
+class SourceScanner:
+    """
+    The :class:`SourceScanner` walks a source tree once and buckets the files by their extension.
+    The stat results of the files are kept, so that the :class:`FileRegistry` does not need to query them again.
+    Subtrees are distributed across `jobs` threads, which mostly wait for the file system. Trees with only a few
+    top level directories are split further down, until there are :attr:`SPLIT` subtrees per thread.
+    """
+
+    SPLIT = 4  # Subtrees per thread, threads which finish early take over the remaining subtrees
+
+    def __init__(self, extensions: list[str], jobs: int = 1):
+        self.extensions: set[str] = set(extensions)
+        self.jobs: int = max(1, jobs)
+
+    def scan(self, root: Path) -> Buckets:
+        """
+        Returns the files below `root` by extension.
+        """
+
+        buckets = {extension: {} for extension in self.extensions}
+        directories = self.scan_directory(root, buckets)
+
+        if self.jobs == 1:
+            for directory in directories:
+                self.walk(directory, buckets)
+
+        else:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                # The levels of the tree are scanned in parallel until there are enough subtrees
+                while directories and len(directories) < self.jobs * SourceScanner.SPLIT:
+                    levels = list(executor.map(self.expand, directories))
+                    directories = []
+
+                    for result, subdirectories in levels:
+                        SourceScanner.merge(buckets, result)
+                        directories.extend(subdirectories)
+
+                results = executor.map(self.walk, directories)
+
+            for result in results:
+                SourceScanner.merge(buckets, result)
+
+        return {extension: dict(sorted(files.items())) for extension, files in buckets.items()}
+
+    def expand(self, directory: str) -> tuple[Buckets, list[str]]:
+        """
+        Scans a single directory and returns its files by extension and its subdirectories.
+        """
+
+        buckets = {extension: {} for extension in self.extensions}
+        return buckets, self.scan_directory(directory, buckets)
+
+    def walk(self, root: str, buckets: Buckets = None) -> Buckets:
+        if buckets is None:
+            buckets = {extension: {} for extension in self.extensions}
+
+        stack = [root]
+
+        while stack:
+            stack.extend(self.scan_directory(stack.pop(), buckets))
+
+        return buckets
+
+    def scan_directory(self, directory: str | Path, buckets: Buckets) -> list[str]:
+        """
+        Adds the matching files of a directory to the buckets and returns its subdirectories.
+        """
+
+        directories = []
+
+        try:
+            entries = scandir(directory)
+        except OSError:
+            return directories
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+
+                elif (extension := SourceScanner.extension(entry)) in self.extensions:
+                    try:
+                        buckets[extension][Path(entry.path)] = entry.stat()
+                    except OSError:
+                        pass
+
+        return directories
+
+    @staticmethod
+    def merge(buckets: Buckets, result: Buckets):
+        for extension, files in result.items():
+            buckets[extension].update(files)
+
+    @staticmethod
+    def extension(entry: DirEntry) -> str | None:
+        _, dot, extension = entry.name.rpartition('.')
+        return extension if dot else None
@@ -0,0 +1,391 @@
+from heapq import heappop, heappush
+from itertools import count
+from pathlib import Path
+from threading import Condition
+
+from util.diagnostic import WarningMessage
+
+
+class SchedulerNode:
+    """
+    A file in the :class:`MungeScheduler` together with its unfinished dependencies and its dependents.
+    The :attr:`priority` is the length of the longest path of munge times from this file through its dependents.
+    """
+
+    def __init__(self, filepath: Path, cost: int = 0):
+        self.filepath: Path = filepath
+        self.pending: set[Path] = set()
+        self.dependents: set[Path] = set()
+        self.processed: bool = False
+        self.finished: bool = False
+        self.cost: int = cost
+        self.priority: int = cost
+        self.entry: tuple[int, int, Path] | None = None  # Current entry in the ready heap
+
+
+class MungeScheduler:
+    """
+    The :class:`MungeScheduler` replaces a flat munge queue with a dependency graph built from the links
+    of the :class:`FileRegistry`. A file is dispatched as soon as all of its scheduled dependencies are
+    munged and the run ends once every scheduled file is finished.
+
+    A processed file whose parser recorded new links waits for these dependencies before it counts
+    as finished. If dependency resolution is enabled, linked files that are not up to date are
+    scheduled as well.
+
+    Ready files are dispatched by the longest remaining critical path first. The munge times of the
+    previous runs are taken from the registry, files without history are estimated by their size.
+    A raised priority is propagated to the pending dependencies, ready files are pushed again and
+    the previous entry in the heap is skipped once it is popped.
+    """
+
+    class CyclicDependency(WarningMessage):
+        TOPIC = 'SCH'
+
+        def __init__(self, src: Path, dst: Path):
+            super().__init__(f'Cyclic dependency between {src} and {dst}! The link is ignored for the munge order.')
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.condition: Condition = Condition()
+
+        self.nodes: dict[Path, SchedulerNode] = {}
+        self.cycles: set[tuple[Path, Path]] = set()
+        self.ready: list[tuple[int, int, Path]] = []
+        self.order = count()
+        self.remaining: int = 0
+        self.rate: float | None = None  # Munge time in ns per byte, estimated once per scheduler
+        self.started: bool = False
+        self.stopped: bool = False
+
+        self.extensions: set[str] = set()
+        self.resolve_dependencies: bool = False
+
+    def __len__(self) -> int:
+        return self.remaining
+
+    @property
+    def done(self) -> bool:
+        return self.remaining == 0 or self.stopped
+
+    def add(self, filepath: Path):
+        """
+        Adds a file to the schedule. Before :meth:`start` only the node is recorded,
+        afterwards the file is linked into the running schedule.
+        """
+
+        with self.condition:
+            node = self._add(filepath)
+
+            if node and self.started:
+                self._link_dependencies(node)
+
+                if not node.pending:
+                    self._release(node)
+
+    def start(self, extensions: set[str] = (), resolve_dependencies: bool = False):
+        """
+        Links all added files and releases the ones without pending dependencies.
+        """
+
+        with self.condition:
+            self.extensions = set(extensions)
+            self.resolve_dependencies = resolve_dependencies
+
+            for node in self.nodes.values():
+                node.cost = self._cost(node.filepath)
+                self._link_dependencies(node)
+
+            self._break_cycles()
+            self._prioritize()
+            self.started = True
+
+            for node in list(self.nodes.values()):
+                if not node.pending:
+                    self._release(node)
+
+            self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def get(self) -> Path | None:
+        """
+        Blocks until a file is ready to be munged. Returns None once the schedule is done.
+        """
+
+        with self.condition:
+            while not self.done:
+                filepath = self._pop()
+
+                if filepath is not None:
+                    return filepath
+
+                self.condition.wait()
+
+            return None
+
+    def take(self) -> list[Path]:
+        """
+        Returns all files that are currently ready to be munged without blocking.
+        """
+
+        with self.condition:
+            if self.stopped:
+                return []
+
+            files = []
+            filepath = self._pop()
+
+            while filepath is not None:
+                files.append(filepath)
+                filepath = self._pop()
+
+            return files
+
+    def complete(self, filepath: Path):
+        """
+        Marks a dispatched file as munged. Dependencies discovered while munging are waited for
+        before the dependents of the file are released.
+        """
+
+        dependency = self.registry.registered_files.get(filepath)
+        links = [link.filepath for link in list(dependency.children)] if dependency else []
+
+        # Checking whether a link is up to date reads the file, the workers are not blocked meanwhile
+        resolvable = {link for link in links if link not in self.nodes and self._resolvable(link)}
+
+        with self.condition:
+            node = self.nodes[filepath]
+            node.processed = True
+            discovered = []
+
+            for link in links:
+                if link not in self.nodes and link in resolvable:
+                    discovered.append(self._add(link))
+
+                if link in self.nodes:
+                    self._link(node, self.nodes[link])
+
+            for dependency_node in discovered:
+                self._link_dependencies(dependency_node)
+
+                if not dependency_node.pending:
+                    self._release(dependency_node)
+
+            if not node.pending:
+                self._finish(node)
+
+            self.condition.notify_all()
+
+    def _add(self, filepath: Path) -> SchedulerNode | None:
+        if filepath in self.nodes:
+            return None
+
+        node = SchedulerNode(filepath, self._cost(filepath) if self.started else 0)
+        self.nodes[filepath] = node
+        self.remaining += 1
+
+        return node
+
+    def _size(self, filepath: Path) -> int:
+        # The stat results of the scan are used, only files that were not scanned are queried
+        return self.registry.stat(filepath).st_size if self.registry.stat_exists(filepath) else 0
+
+    def _rate(self) -> float:
+        if self.rate is None:
+            durations = 0
+            sizes = 0
+
+            for filepath, dependency in list(self.registry.registered_files.items()):
+                if dependency.duration:
+                    size = self._size(filepath)
+
+                    if size:
+                        durations += dependency.duration
+                        sizes += size
+
+            self.rate = durations / sizes if durations and sizes else 1.0
+
+        return self.rate
+
+    def _cost(self, filepath: Path) -> int:
+        dependency = self.registry.registered_files.get(filepath)
+
+        if dependency and dependency.duration:
+            return dependency.duration
+
+        return int(self._size(filepath) * self._rate())
+
+    def _resolvable(self, filepath: Path) -> bool:
+        return bool(
+            self.resolve_dependencies
+            and filepath.suffix[1:] in self.extensions
+            and filepath.exists()
+            and not self.registry.is_up_to_date(filepath)
+        )
+
+    def _link_dependencies(self, node: SchedulerNode):
+        dependency = self.registry.registered_files.get(node.filepath)
+
+        if dependency:
+            for link in list(dependency.children):
+                if link.filepath in self.nodes:
+                    self._link(node, self.nodes[link.filepath])
+
+    def _link(self, node: SchedulerNode, dependency: SchedulerNode):
+        if dependency.finished or dependency is node or dependency.filepath in node.pending:
+            return
+
+        if (node.filepath, dependency.filepath) in self.cycles:
+            return
+
+        if self.started and self._depends(dependency, node):
+            self._ignore(node.filepath, dependency.filepath)
+            return
+
+        node.pending.add(dependency.filepath)
+        dependency.dependents.add(node.filepath)
+
+        if self.started:
+            self._raise(dependency, node)
+
+    def _raise(self, dependency: SchedulerNode, dependent: SchedulerNode):
+        """
+        Raises the priority of a dependency and its transitive dependencies to the critical path through a dependent.
+        """
+
+        stack = [(dependency, dependent)]
+
+        while stack:
+            dependency, dependent = stack.pop()
+
+            # The munge time of a processed dependent is already spent
+            remaining = dependent.priority - dependent.cost if dependent.processed else dependent.priority
+            priority = dependency.cost + remaining
+
+            if priority <= dependency.priority:
+                continue
+
+            dependency.priority = priority
+
+            if dependency.entry is not None:
+                self._push(dependency)
+
+            stack.extend((self.nodes[filepath], dependency) for filepath in dependency.pending)
+
+    def _depends(self, node: SchedulerNode, dependency: SchedulerNode) -> bool:
+        """
+        Checks whether `node` (transitively) waits for `dependency`.
+        """
+
+        visited = set()
+        stack = [node.filepath]
+
+        while stack:
+            filepath = stack.pop()
+            if filepath == dependency.filepath:
+                return True
+
+            if filepath not in visited:
+                visited.add(filepath)
+                stack.extend(self.nodes[filepath].pending)
+
+        return False
+
+    def _break_cycles(self):
+        """
+        Removes links that close a cycle so that every node can be released eventually.
+        """
+
+        Visiting, Visited = 1, 2
+        state = {}
+
+        for root in sorted(self.nodes):
+            if root in state:
+                continue
+
+            state[root] = Visiting
+            stack = [(root, iter(sorted(self.nodes[root].pending)))]
+
+            while stack:
+                filepath, dependencies = stack[-1]
+
+                for dependency in dependencies:
+                    if state.get(dependency) == Visiting:
+                        self.nodes[filepath].pending.discard(dependency)
+                        self.nodes[dependency].dependents.discard(filepath)
+                        self._ignore(filepath, dependency)
+
+                    elif dependency not in state:
+                        state[dependency] = Visiting
+                        stack.append((dependency, iter(sorted(self.nodes[dependency].pending))))
+                        break
+
+                else:
+                    state[filepath] = Visited
+                    stack.pop()
+
+    def _prioritize(self):
+        """
+        Computes the critical path of each node, dependents before their dependencies.
+        """
+
+        pending = {filepath: len(node.pending) for filepath, node in self.nodes.items()}
+        stack = [filepath for filepath, dependencies in pending.items() if dependencies == 0]
+        order = []
+
+        while stack:
+            filepath = stack.pop()
+            order.append(filepath)
+
+            for dependent in self.nodes[filepath].dependents:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    stack.append(dependent)
+
+        for filepath in reversed(order):
+            node = self.nodes[filepath]
+            node.priority = node.cost + max((self.nodes[d].priority for d in node.dependents), default=0)
+
+    def _ignore(self, src: Path, dst: Path):
+        self.cycles.add((src, dst))
+        self.registry.diagnostic.report(MungeScheduler.CyclicDependency(src, dst))
+
+    def _release(self, node: SchedulerNode):
+        if node.processed:
+            self._finish(node)
+        else:
+            self._push(node)
+
+    def _push(self, node: SchedulerNode):
+        # A previous entry of the node stays in the heap and is skipped by :meth:`_pop`
+        node.entry = (-node.priority, next(self.order), node.filepath)
+        heappush(self.ready, node.entry)
+
+    def _pop(self) -> Path | None:
+        if self.stopped:
+            return None
+
+        while self.ready:
+            entry = heappop(self.ready)
+            node = self.nodes[entry[2]]
+
+            if node.entry is entry:
+                node.entry = None
+                return node.filepath
+
+        return None
+
+    def _finish(self, node: SchedulerNode):
+        node.finished = True
+        self.remaining -= 1
+
+        for filepath in node.dependents:
+            dependent = self.nodes[filepath]
+            dependent.pending.discard(node.filepath)
+
+            if not dependent.pending:
+                self._release(dependent)
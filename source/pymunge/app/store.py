@@ -0,0 +1,161 @@
+import sqlite3
+from pathlib import Path
+from threading import Lock
+
+from util.logging import ScopedLogger, get_logger
+
+
+class DependencyStore:
+    """
+    The :class:`DependencyStore` persists the build information of the :class:`FileRegistry` in a SQLite database.
+    Files and links are looked up individually when the registry needs them and only changed entries are written
+    back, so neither loading nor storing depends on the total number of known files.
+
+    The diagnostics reported while munging a file are kept as well, so that they can be reported again
+    when the file is skipped.
+
+    The schema is versioned with `PRAGMA user_version`. A database of another version or of another
+    source/target pair is cleared.
+    """
+
+    FILE = '.pymunge.db'
+    VERSION = 3
+
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS files ('
+        'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, inode INTEGER NOT NULL, '
+        'digest BLOB NOT NULL, recorded INTEGER NOT NULL, duration INTEGER NOT NULL, munged INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS links (src TEXT NOT NULL, dst TEXT NOT NULL, PRIMARY KEY (src, dst)) WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS links_dst ON links (dst)',
+        'CREATE TABLE IF NOT EXISTS diagnostics (path TEXT PRIMARY KEY, messages BLOB NOT NULL)',
+    ]
+
+    def __init__(self, filepath: Path, source: Path, target: Path, logger: ScopedLogger = get_logger(__name__)):
+        self.filepath: Path = filepath
+        self.logger: ScopedLogger = logger
+        self.lock: Lock = Lock()
+
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+
+        if version != DependencyStore.VERSION:
+            self.logger.info(f'Recreate dependency store "{filepath}" (version {version})')
+            self.drop()
+
+        with self.connection:
+            for statement in DependencyStore.SCHEMA:
+                self.connection.execute(statement)
+
+        meta = dict(self.connection.execute('SELECT key, value FROM meta'))
+
+        if meta and (meta.get('source') != str(source) or meta.get('target') != str(target)):
+            self.logger.info(f'Clear dependency store "{filepath}" of "{meta.get("source")}"')
+            self.clear()
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?)', [('source', str(source)), ('target', str(target))]
+            )
+
+    def drop(self):
+        with self.connection:
+            for table in ['meta', 'files', 'links', 'diagnostics']:
+                self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+            self.connection.execute(f'PRAGMA user_version = {DependencyStore.VERSION}')
+
+    def clear(self):
+        with self.connection:
+            for table in ['meta', 'files', 'links', 'diagnostics']:
+                self.connection.execute(f'DELETE FROM {table}')
+
+    def file(self, filepath: Path) -> tuple[tuple[int, int, int], bytes, int, int, bool] | None:
+        """
+        Returns the signature (size, mtime, inode), content hash, record time, munge time and munge state
+        of a file or None if it is unknown.
+        """
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT size, mtime, inode, digest, recorded, duration, munged FROM files WHERE path = ?',
+                (str(filepath), )
+            ).fetchone()
+
+        return (tuple(row[:3]), row[3], row[4], row[5], bool(row[6])) if row else None
+
+    def links(self, filepath: Path) -> list[Path]:
+        """
+        Returns the destinations of the links of a file.
+        """
+
+        with self.lock:
+            rows = self.connection.execute('SELECT dst FROM links WHERE src = ?', (str(filepath), )).fetchall()
+
+        return [Path(dst) for dst, in rows]
+
+    def dependents(self, filepath: Path) -> list[Path]:
+        """
+        Returns the sources of the links to a file.
+        """
+
+        with self.lock:
+            rows = self.connection.execute('SELECT src FROM links WHERE dst = ?', (str(filepath), )).fetchall()
+
+        return [Path(src) for src, in rows]
+
+    def diagnostics(self, filepath: Path) -> bytes | None:
+        """
+        Returns the diagnostics of a file encoded with :meth:`Diagnostic.dumps`.
+        """
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT messages FROM diagnostics WHERE path = ?', (str(filepath), )
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def update(
+        self,
+        files: list[tuple],
+        links: list[tuple[Path, Path]],
+        diagnostics: list[tuple[Path, bytes]] = (),
+        relinked: list[Path] = ()
+    ):
+        """
+        Writes the given files, links and diagnostics in a single transaction. The files are given as
+        (path, signature, digest, recorded, duration, munged). The stored links of the relinked files
+        are replaced by the given links.
+        """
+
+        # yapf: disable
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM links WHERE src = ?', [(str(path), ) for path in relinked]
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (str(path), *signature, digest, recorded, duration, int(munged))
+                    for path, signature, digest, recorded, duration, munged in files
+                ]
+            )
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO links VALUES (?, ?)', [(str(src), str(dst)) for src, dst in links]
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO diagnostics VALUES (?, ?)', [(str(path), data) for path, data in diagnostics]
+            )
+        # yapf: enable
+
+    def remove(self, filepath: Path):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM files WHERE path = ?', (str(filepath), ))
+            self.connection.execute('DELETE FROM links WHERE src = ?', (str(filepath), ))
+            self.connection.execute('DELETE FROM diagnostics WHERE path = ?', (str(filepath), ))
+
+    def close(self):
+        self.connection.close()
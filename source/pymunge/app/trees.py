@@ -0,0 +1,179 @@
+import marshal
+from os.path import normpath, relpath
+from pathlib import Path
+from sys import modules
+
+from parxel.nodes import Document, LexicalNode, Node
+from parxel.token import Token
+
+from app.cache import BuildCache
+from util.diagnostic import DiagnosticMessage
+from util.logging import ScopedLogger, get_logger
+
+
+class TreeCache:
+    """
+    The :class:`TreeCache` stores parse trees by the content of their source files, so that a file
+    which is formatted and munged afterwards is tokenized and parsed only once.
+
+    Trees are encoded with :mod:`marshal` as a flat list of nodes in pre-order. A node is stored as
+    its type, the index of its parent and its own attributes. Array views are stored with their format
+    and shape. Lexical nodes keep their raw text and the position of their first token instead of their
+    token list. Paths are stored relative to the source file, so an entry does not depend on where the
+    file is located. The links and diagnostics reported while parsing are stored as well, they have to
+    be replayed whenever the tree is loaded. Diagnostics keep their template and arguments, so they are
+    still only formatted when rendered.
+
+    Entries are kept in a :class:`BuildCache` with the parser name, :attr:`SwbfParser.Version` and
+    :attr:`FORMAT` as kind.
+    """
+
+    FORMAT = 2  # Version of the encoding
+    SIZE = 1 << 30  # Least recently used trees are evicted beyond this size
+    TRANSIENT = {'children', 'parent', 'scope', 'tokens'}  # Restored from the structure of the tree
+
+    def __init__(self, directory: Path, salt: str = '', logger: ScopedLogger = get_logger(__name__)):
+        self.cache: BuildCache = BuildCache(directory, salt=salt, size=TreeCache.SIZE, logger=logger)
+        self.logger: ScopedLogger = logger
+
+    def key(self, filepath: Path, digest: bytes | None = None) -> str:
+        return self.cache.key(filepath, digest)
+
+    @staticmethod
+    def kind(parser_type: type) -> str:
+        return f'{parser_type.__name__.lower()}{parser_type.Version}-{TreeCache.FORMAT}'
+
+    def load(self, key: str, filepath: Path, parser_type: type, logger: ScopedLogger):
+        """
+        Returns the cached tree of a file with the links and diagnostics recorded while parsing it,
+        or None if there is no entry.
+        """
+
+        data = self.cache.load(key, TreeCache.kind(parser_type))
+
+        if data is None:
+            return None
+
+        try:
+            return self.decode(data, filepath, parser_type, logger)
+
+        except (AttributeError, KeyError, TypeError, ValueError, EOFError) as e:
+            self.logger.debug(f'Could not decode the cached tree of "{filepath}": {e}')
+            return None
+
+    def store(self, key: str, tree: Document, links: list[Path], messages: list[DiagnosticMessage]):
+        try:
+            data = self.encode(tree, links, messages)
+
+        except ValueError as e:
+            self.logger.debug(f'Could not encode the tree of "{tree.filepath}": {e}')
+            return
+
+        self.cache.store(key, TreeCache.kind(type(tree)), data)
+
+    def evict(self):
+        self.cache.evict()
+
+    @staticmethod
+    def encode(tree: Document, links: list[Path], messages: list[DiagnosticMessage]) -> bytes:
+        base = tree.filepath.parent
+        types: dict[type, int] = {}
+        nodes = []
+
+        def encode_type(node_type: type) -> int:
+            if node_type not in types:
+                types[node_type] = len(types)
+            return types[node_type]
+
+        def encode_node(node: Node) -> tuple:
+            state = {}
+            paths = {}
+            views = {}
+
+            for name, value in vars(node).items():
+                if name in TreeCache.TRANSIENT:
+                    continue
+
+                if isinstance(value, Node):
+                    raise ValueError(f'Node reference "{name}" of {node.type()} can not be encoded')
+                elif isinstance(value, Path):
+                    paths[name] = relpath(value, base)
+                elif isinstance(value, memoryview):
+                    views[name] = (value.format, value.shape, value.tobytes())
+                else:
+                    state[name] = value
+
+            # The text of all tokens is restored as a single token at the position of the first one
+            if not isinstance(node, LexicalNode):
+                lexical = None
+            elif node.tokens:
+                lexical = (node.raw(), node.tokens[0].row, node.tokens[0].col)
+            else:
+                lexical = ()
+
+            return state, paths, views, lexical
+
+        stack = [(child, 0) for child in reversed(tree.children)]
+
+        while stack:
+            node, parent = stack.pop()
+            nodes.append((encode_type(type(node)), parent, *encode_node(node)))
+
+            index = len(nodes)
+            stack.extend((child, index) for child in reversed(node.children))
+
+        # yapf: disable
+        return marshal.dumps((
+            [(t.__module__, t.__qualname__) for t in types],
+            nodes,
+            [relpath(link, base) for link in links],
+            [message.encode() for message in messages]
+        ))
+        # yapf: enable
+
+    @staticmethod
+    def decode(data: bytes, filepath: Path, parser_type: type, logger: ScopedLogger):
+        types, nodes, links, messages = marshal.loads(data)
+        base = filepath.parent
+
+        def resolve(module: str, name: str) -> type:
+            resolved = modules[module]
+            for part in name.split('.'):
+                resolved = getattr(resolved, part)
+            return resolved
+
+        def path(relative: str) -> Path:
+            return Path(normpath(base / relative))
+
+        types = [resolve(module, name) for module, name in types]
+        tree = parser_type.empty(filepath=filepath, logger=logger)
+        decoded = [tree]
+
+        def view(format: str, shape: tuple, data: bytes) -> memoryview:
+            return memoryview(data).cast(format, shape) if data else memoryview(data).cast(format)
+
+        for node_type, parent, state, paths, views, lexical in nodes:
+            node = types[node_type].__new__(types[node_type])
+            node.__dict__.update(state)
+            node.children = []
+            node.scope = node
+
+            for name, relative in paths.items():
+                setattr(node, name, path(relative))
+
+            for name, (format, shape, data) in views.items():
+                setattr(node, name, view(format, shape, data))
+
+            if lexical:
+                raw, row, col = lexical
+                node.tokens = [Token(row=row, col=col, text=raw)]
+            elif lexical is not None:
+                node.tokens = []
+
+            decoded[parent].add(node)
+            decoded.append(node)
+
+        links = [path(link) for link in links]
+        messages = [DiagnosticMessage.decode(message) for message in messages]
+
+        return tree, links, messages
@@ -0,0 +1,79 @@
+from os import stat_result
+from pathlib import Path
+from threading import Event
+from time import monotonic
+
+from app.scanner import SourceScanner
+from util.logging import ScopedLogger, get_logger
+
+
+class SourceWatcher:
+    """
+    The :class:`SourceWatcher` polls the source tree for changed, added and removed files.
+    A burst of changes (e.g. saving several files or a checkout) is reported at once after
+    no further change was seen for `debounce` seconds.
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        extensions: list[str],
+        jobs: int = 1,
+        interval: float = 0.5,
+        debounce: float = 0.3,
+        logger: ScopedLogger = get_logger(__name__)
+    ):
+        self.source: Path = source
+        self.scanner: SourceScanner = SourceScanner(extensions, jobs)
+        self.interval: float = interval
+        self.debounce: float = debounce
+        self.logger: ScopedLogger = logger
+
+        self.files: dict[Path, stat_result] = self.scan()
+
+    def scan(self) -> dict[Path, stat_result]:
+        if not self.source.is_dir():
+            return {self.source: self.source.stat()} if self.source.exists() else {}
+
+        files = {}
+        for bucket in self.scanner.scan(self.source).values():
+            files.update(bucket)
+        return files
+
+    @staticmethod
+    def changed(before: stat_result | None, after: stat_result) -> bool:
+        if before is None:
+            return True
+        return (before.st_size, before.st_mtime_ns, before.st_ino) != (after.st_size, after.st_mtime_ns, after.st_ino)
+
+    def wait(self, stop: Event) -> tuple[dict[Path, stat_result], list[Path]] | None:
+        """
+        Blocks until files changed and returns the changed files with their stat results and the removed files.
+        Returns None once `stop` is set.
+        """
+
+        changed = {}
+        removed = set()
+        last_change = None
+
+        while not stop.wait(self.interval if last_change is None else min(self.interval, self.debounce)):
+            files = self.scan()
+
+            for filepath, stat in files.items():
+                if SourceWatcher.changed(self.files.get(filepath), stat):
+                    changed[filepath] = stat
+                    removed.discard(filepath)
+                    last_change = monotonic()
+
+            for filepath in self.files.keys() - files.keys():
+                changed.pop(filepath, None)
+                removed.add(filepath)
+                last_change = monotonic()
+
+            self.files = files
+
+            if last_change is not None and monotonic() - last_change >= self.debounce:
+                self.logger.info(f'Detected {len(changed)} changed and {len(removed)} removed files')
+                return changed, sorted(removed)
+
+        return None
@@ -0,0 +1,59 @@
+"""
+Thin client of the pymunge daemon (`pymunge serve`). The arguments are passed on as they are:
+
+    python client.py [-S <socket>] munge -s <source> -t <target>
+
+Only the standard library is imported, so a call costs an interpreter start and a socket round trip.
+"""
+
+import json
+import socket
+from os import environ, getcwd
+from pathlib import Path
+from sys import argv, exit, stderr, stdout
+
+
+SOCKET_FILE = '.pymunge.sock'
+
+
+def request(path: Path, args: list[str]) -> int:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(path))
+        connection.sendall(json.dumps({'argv': args, 'cwd': getcwd()}).encode() + b'\n')
+
+        with connection.makefile('r', encoding='utf-8') as stream:
+            for line in stream:
+                message = json.loads(line)
+
+                if 'out' in message:
+                    stdout.write(message['out'])
+                    stdout.flush()
+
+                elif 'exit' in message:
+                    return message['exit']
+
+    return 1
+
+
+def main() -> int:
+    if not hasattr(socket, 'AF_UNIX'):
+        print('The pymunge daemon is not supported on this platform, it requires Unix domain sockets', file=stderr)
+        return 1
+
+    args = argv[1:]
+    path = Path(environ.get('PYMUNGE_SOCKET', Path(getcwd()) / SOCKET_FILE))
+
+    if args[:1] in (['-S'], ['--socket']):
+        path = Path(args[1])
+        args = args[2:]
+
+    try:
+        return request(path, args)
+
+    except OSError as e:
+        print(f'Could not reach the pymunge daemon at "{path}": {e}', file=stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
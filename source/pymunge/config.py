@@ -1,4 +1,5 @@
 from argparse import ArgumentParser, ArgumentTypeError, Namespace, ArgumentTypeError, Namespace, _SubParsersAction
+from multiprocessing import cpu_count
 from os import getcwd
 from pathlib import Path
 from sys import path as PATH
@@ -11,7 +12,7 @@ PYMUNGE_DIR = BASE_DIR.parent
 PATH.append(str(PYMUNGE_DIR))
 
 
-from swbf.parsers.parser import Ext # TODO: remove
+from swbf.parsers.parser import ArrayMode, ChunkMode, Ext, InputMode, ParserMode # TODO: remove
 from util.logging import LogLevel
 from util.enumeration import Enum
 
@@ -20,6 +21,7 @@ class Run(Enum):
     Cache = 'cache'
     Format = 'format'
     Munge = 'munge'
+    Serve = 'serve'
 
 
 def MungePath(arg: str) -> Path:
@@ -40,6 +42,15 @@ def File(arg: str) -> Path:
     return path.resolve()
 
 
+class Executor(Enum):
+    """
+    Determines how the munge workers are executed. Threads share the interpreter (and the GIL),
+    processes munge files in parallel and report their results back to the main process.
+    """
+    Process = 'process'
+    Thread = 'thread'
+
+
 class MungeFlags(Enum):
     Test1 = 'Test1'
     Test2 = 'Test2'
@@ -103,17 +114,27 @@ class GameVersion(Enum):
 
 class Default:
     CACHE_FILE = '.pymunge.cache'
-    GRAPH_FILE = '.pymunge.graph'
+    GRAPH_FILE = '.pymunge.db'
     LOG_FILE = '.pymunge.log'
+    SOCKET_FILE = '.pymunge.sock'
     STYLE_FILE = '.style.py'
+    TREE_CACHE = '.pymunge.trees'
 
 
 # Default config
 CONFIG = Namespace(**{
     'ansi_style': False,
+    'arrays': ArrayMode.List,
+    'chunks': ChunkMode.Eager,
+    'diagnostic_limit': 10,
+    'diagnostics': None,
     'log_file': Default.LOG_FILE,
     'log_level': LogLevel.Debug,
     'headless': False,
+    'input': InputMode.Read,
+    'no_tree_cache': False,
+    'parser': ParserMode.Fast,
+    'tree_cache': CWD / Default.TREE_CACHE,
     'version': False,
     'run': 'munge',
 
@@ -131,18 +152,31 @@ CONFIG = Namespace(**{
 
     'munge': Namespace(**{
         'binary_dir': CWD,
+        'build_cache': None,
         'cache_file': CWD / Default.CACHE_FILE,
         'clean': False,
         'dry_run': False,
+        'executor': Executor.Thread,
         'interactive': False,
+        'jobs': max(1, cpu_count() - 1),
         'mode': MungeMode.Full,
+        'no_build_cache': False,
         'platform': MungePlatform.PC,
         'resolve_dependencies': True,
+        'shared_cache': None,
+        'shared_cache_size': 4 << 30,
         'source': CWD,
         'target': CWD,
         'tool': None,
+        'watch': False,
+        'watch_debounce': 0.3,
+        'watch_interval': 0.5,
         'game_version': GameVersion._1
     }),
+
+    'serve': Namespace(**{
+        'socket': CWD / Default.SOCKET_FILE
+    }),
 })
 
 
@@ -208,8 +242,8 @@ def merge_namespace(default: Namespace, file: Namespace, cli: Namespace) -> Name
     return args
 
 
-def populate_config(parser: ArgumentParser):
-    cli_args = parser.parse_args()
+def populate_config(parser: ArgumentParser, argv: list[str] = None):
+    cli_args = parser.parse_args(argv)
     build_args(parser, cli_args)
 
     cfg_args = Namespace()
@@ -1,15 +1,18 @@
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
 from signal import signal, SIGINT, SIGTERM
+import socket
 from sys import exit
 
 from app.environment import MungeEnvironment
 from app.munger import Munger
+from app.registry import FileRegistry
+from app.watcher import SourceWatcher
 from config import CONFIG, CWD, populate_config, File, MungePath
-from config import GameVersion, MungeFlags, MungeMode, MungePlatform, MungeTool, Run
-from swbf.parsers.parser import Ext
+from config import Executor, GameVersion, MungeFlags, MungeMode, MungePlatform, MungeTool, Run
+from swbf.parsers.parser import ArrayMode, ChunkMode, Ext, InputMode, ParserMode
 from util.enumeration import Enum
-from util.logging import LogLevel, get_logger
+from util.logging import LogLevel, ScopedLogger, get_formatter, get_logger
 from util.status import ExitCode
 from version import INFO as VERSION_INFO
 
@@ -22,11 +25,19 @@ def create_parser():
     parser = ArgumentParser('pymunge')
     parser.add_argument('-a', '--ansi-style', action='store_true', default=CONFIG.ansi_style)
     parser.add_argument('-c', '--config', type=File)
+    parser.add_argument('-D', '--diagnostics', type=Path, default=CONFIG.diagnostics)
+    parser.add_argument('--diagnostic-limit', type=int, default=CONFIG.diagnostic_limit)
     parser.add_argument('-f', '--log-file', type=str, default=CONFIG.log_file)
     parser.add_argument('-l', '--log-level', type=str, default=CONFIG.log_level, choices=LogLevel.vals())
     parser.add_argument('-n', '--no-log-file', action='store_true')
     parser.add_argument('-H', '--headless', action='store_true', default=CONFIG.headless)
     parser.add_argument('-v', '--version', action='store_true', default=CONFIG.version)
+    parser.add_argument('--parser', type=str, default=CONFIG.parser, choices=ParserMode.vals())
+    parser.add_argument('--arrays', type=str, default=CONFIG.arrays, choices=ArrayMode.vals())
+    parser.add_argument('--chunks', type=str, default=CONFIG.chunks, choices=ChunkMode.vals())
+    parser.add_argument('--input', type=str, default=CONFIG.input, choices=InputMode.vals())
+    parser.add_argument('--tree-cache', type=MungePath, default=CONFIG.tree_cache)
+    parser.add_argument('--no-tree-cache', action='store_true', default=CONFIG.no_tree_cache)
 
     run_parsers = parser.add_subparsers(dest='run', required=True)
 
@@ -45,14 +56,24 @@ def create_parser():
     munge.add_argument('-c', '--cache-file', type=Path, default=CONFIG.munge.cache_file)
     munge.add_argument('-C', '--clean', action='store_true', default=CONFIG.munge.clean)
     munge.add_argument('-d', '--dry-run', action='store_true', default=CONFIG.munge.dry_run)
+    munge.add_argument('-e', '--executor', type=str, default=CONFIG.munge.executor, choices=Executor.vals())
     munge.add_argument('-f', '--flags', type=str, action='append', choices=MungeFlags.vals())
     munge.add_argument('-i', '--interactive', action='store_true', default=CONFIG.munge.interactive)
+    munge.add_argument('-j', '--jobs', type=int, default=CONFIG.munge.jobs)
     munge.add_argument('-m', '--mode', type=str, default=CONFIG.munge.mode, choices=MungeMode.vals())
     munge.add_argument('-p', '--platform', type=str, default=CONFIG.munge.platform, choices=MungePlatform.vals())
     munge.add_argument('-r', '--resolve-dependencies', action='store_true', default=CONFIG.munge.resolve_dependencies)
     munge.add_argument('-s', '--source', type=MungePath, default=CONFIG.munge.source)
     munge.add_argument('-t', '--target', type=MungePath, default=CONFIG.munge.target)
     munge.add_argument('-v', '--game-version', type=str, default=CONFIG.munge.game_version, choices=GameVersion.vals())
+    munge.add_argument('-w', '--watch', action='store_true', default=CONFIG.munge.watch)
+    munge.add_argument('--build-cache', type=MungePath, default=CONFIG.munge.build_cache)
+    munge.add_argument('--no-build-cache', action='store_true', default=CONFIG.munge.no_build_cache)
+    munge.add_argument('--shared-cache', type=MungePath, default=CONFIG.munge.shared_cache)
+    munge.add_argument('--shared-cache-size', type=int, default=CONFIG.munge.shared_cache_size)
+
+    serve = run_parsers.add_parser(Run.Serve)
+    serve.add_argument('-S', '--socket', type=Path, default=CONFIG.serve.socket)
 
     munge_parsers = munge.add_subparsers(dest='tool')
 
@@ -64,26 +85,27 @@ def create_parser():
     return parser
 
 
-def main():
-    parser = create_parser()
-
-    args = populate_config(parser)
-
-    if args.version:
-        print(VERSION_INFO)
-        return ExitCode.Success
-
-    log_path = None if args.no_log_file else CWD
-    log_file = None if args.no_log_file else args.log_file
-    logger = get_logger('pymunge', filepath=log_path, filename=log_file, level=args.log_level, ansi_style=args.ansi_style)
+def execute(args: Namespace, logger: ScopedLogger, registries: dict[tuple[Path, Path], FileRegistry] = None) -> int:
+    """
+    Runs the given arguments. If `registries` is given, the registry of a source and target pair is kept
+    there and reused by later calls (see :class:`MungeDaemon`).
+    """
 
     logger.debug(f'Munger config:')
     with logger:
         for key, arg in args.__dict__.items():
             logger.debug(f'{key:20s} {arg}')
 
+    completed = True  # False if a run was stopped by an error
+
     try:
-        environment = MungeEnvironment(args, logger)
+        MungeEnvironment.reset()
+
+        registry = None
+        if registries is not None and args.run == Run.Munge:
+            registry = registries.get((args.munge.source, args.munge.target))
+
+        environment = MungeEnvironment(args, logger, registry=registry)
 
         if args.run == Run.Cache:
             environment.load_cache()
@@ -91,8 +113,8 @@ def main():
         elif args.run == Run.Format:
             environment.registry.collect_munge_files(args.format.filters)
 
-            munger = Munger(args.run, args.format.style, args.format.check)
-            munger.run()
+            munger = Munger(args.run, args.format.style, args.format.check, jobs=args.munge.jobs)
+            completed = munger.run()
 
         elif args.run == Run.Munge:
             if args.munge.tool:
@@ -100,27 +122,140 @@ def main():
             else:
                 source_filters = [Ext.Req]
 
-            environment.registry.load_dependencies()
-            environment.registry.collect_munge_files(source_filters)
-
-            munger = Munger(args.run)
-            munger.run()
+            if not args.munge.clean and not environment.registry.store:
+                environment.registry.load_dependencies()
+
+            if registries is not None:
+                registries[(args.munge.source, args.munge.target)] = environment.registry
+            if args.munge.watch:
+                # Snapshot before the first run, so that changes made during the run are picked up
+                # yapf: disable
+                watcher = SourceWatcher(
+                    args.munge.source,
+                    set(source_filters) | set(Munger.PARSER),
+                    jobs=args.munge.jobs,
+                    interval=args.munge.watch_interval,
+                    debounce=args.munge.watch_debounce,
+                    logger=logger
+                )
+                # yapf: enable
+
+            environment.registry.collect_munge_files(source_filters, args.munge.jobs)
+
+            # yapf: disable
+            munger = Munger(
+                args.run,
+                jobs=args.munge.jobs,
+                executor=args.munge.executor,
+                resolve_dependencies=args.munge.resolve_dependencies
+            )
+            # yapf: enable
+            completed = munger.run()
+
+            if MungeEnvironment.Cache:
+                MungeEnvironment.Cache.evict()
 
             environment.store_cache()
             environment.registry.store_dependencies()
 
+            if args.munge.watch:
+                environment.summary()
+                logger.info(f'Watching "{args.munge.source}" for changes')
+
+                while changes := watcher.wait(Munger.InterruptEvent):
+                    environment.clear()
+                    environment.registry.refresh(*changes, source_filters)
+
+                    # A failed round is reported and the next change is munged again
+                    completed = munger.run()
+
+                    if not completed:
+                        logger.error('Munging stopped after an error, waiting for changes')
+
+                    if MungeEnvironment.Cache:
+                        MungeEnvironment.Cache.evict()
+
+                    environment.registry.store_dependencies()
+                    environment.summary()
+
+        if MungeEnvironment.Trees:
+            MungeEnvironment.Trees.evict()
+
         if args.log_level == LogLevel.Debug:
             environment.details()
 
         environment.summary()
 
+        if args.diagnostics:
+            environment.diagnostic.export(args.diagnostics)
+
     except Exception as e:
         logger.error(str(e))
 
         return ExitCode.Failure
 
+    return ExitCode.Success if completed else ExitCode.Failure
+
+
+def serve(args: Namespace, logger: ScopedLogger) -> int:
+    if not hasattr(socket, 'AF_UNIX'):
+        logger.error('The pymunge daemon is not supported on this platform, it requires Unix domain sockets')
+        return ExitCode.Failure
+
+    # Only imported when serving, the socket server does not exist on platforms without Unix domain sockets
+    from app.daemon import ClientLogHandler, ClientStream, MungeDaemon
+
+    registries = {}
+
+    def request(argv: list[str], stream: ClientStream) -> int:
+        args = populate_config(create_parser(), argv)
+
+        if args.version:
+            stream.write(VERSION_INFO + '\n')
+            return ExitCode.Success
+
+        # A watching run never returns and would block the daemon for all other requests
+        if args.run == Run.Munge and args.munge.watch:
+            stream.write('Watching is not supported by the pymunge daemon, run "pymunge munge --watch" instead\n')
+            return ExitCode.Failure
+
+        handler = ClientLogHandler(stream, args.log_level)
+        handler.setFormatter(get_formatter(args.ansi_style))
+
+        level = logger.logger.level
+        logger.logger.addHandler(handler)
+        logger.logger.setLevel(args.log_level.upper())
+
+        try:
+            return execute(args, logger, registries)
+
+        finally:
+            logger.logger.removeHandler(handler)
+            logger.logger.setLevel(level)
+
+    MungeDaemon(args.serve.socket, request, logger).serve()
+
     return ExitCode.Success
 
 
+def main():
+    parser = create_parser()
+
+    args = populate_config(parser)
+
+    if args.version:
+        print(VERSION_INFO)
+        return ExitCode.Success
+
+    log_path = None if args.no_log_file else CWD
+    log_file = None if args.no_log_file else args.log_file
+    logger = get_logger('pymunge', filepath=log_path, filename=log_file, level=args.log_level, ansi_style=args.ansi_style)
+
+    if args.run == Run.Serve:
+        return serve(args, logger)
+
+    return execute(args, logger)
+
+
 if __name__ == '__main__':
     exit(main())
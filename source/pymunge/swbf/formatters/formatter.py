@@ -15,6 +15,8 @@ class IncompleteFormatConfiguration(ErrorMessage):
 
 
 class SwbfFormatter:
+    Styles: dict[Path, tuple[int, SimpleNamespace]] = {}  # Loaded style files with their mtime
+
     def __init__(self, tree: TextParser, style: Path):
         self.style = self.load_style(style)
         self.configure_style()
@@ -24,6 +26,12 @@ class SwbfFormatter:
 
     @staticmethod
     def load_style(file: Path):
+        mtime = file.stat().st_mtime_ns
+        loaded = SwbfFormatter.Styles.get(file)
+
+        if loaded and loaded[0] == mtime:
+            return loaded[1]
+
         try:
             spec = util.spec_from_file_location(file.stem, file)
             module = util.module_from_spec(spec)
@@ -44,7 +52,10 @@ class SwbfFormatter:
                     setattr(ns, k, v)
             return ns
 
-        return dict_to_ns(module.style)
+        style = dict_to_ns(module.style)
+        SwbfFormatter.Styles[file] = (mtime, style)
+
+        return style
 
     def configure_style(self):
         self.trailing_comment_space: str = ' ' * self.style.trailingCommentSpace or 2
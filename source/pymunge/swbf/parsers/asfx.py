@@ -53,7 +53,7 @@ class Switch(LexicalNode):
         self.value: str = self.raw().strip()
 
         if self.value not in AsfxParser.Switch:
-            ENV.Diag.report(AsxWarning(f'Switch "{self.name}" is not known.'))
+            ENV.Diag.report(AsxWarning('Switch "{}" is not known.', self.name))
 
 
 class Config(LexicalNode):
@@ -64,7 +64,7 @@ class Config(LexicalNode):
         self.value: str = self.raw().strip()
 
         if self.value not in AsfxParser.Config:
-            ENV.Diag.report(AsxWarning(f'Config "{self.name}" is not known.'))
+            ENV.Diag.report(AsxWarning('Config "{}" is not known.', self.name))
 
         #elif self.value not in Asfx.SwitchConfigValue[self.parent.value]:
         #    self.logger.warning(f'Config "{self.value}" is not a valid config for {self.parent.value}.')
@@ -78,7 +78,7 @@ class Value(LexicalNode):
         self.value: str = self.raw().strip()
 
         if self.value not in AsfxParser.Value:
-            ENV.Diag.report(AsxWarning(f'Value "{self.name}" is not known.'))
+            ENV.Diag.report(AsxWarning('Value "{}" is not known.', self.name))
 
         #elif self.value not in Asfx.SwitchConfigValue[self.parent.parent.value][self.parent.value]:
         #    self.logger.warning(f'Value "{self.value}" is not a valid value for config {self.parent.value}.')
@@ -9,21 +9,42 @@ from swbf.parsers.parser import Ext, SwbfTextParser
 from util.diagnostic import WarningMessage
 from util.enumeration import Enum
 from util.logging import get_logger
+from util.suggestion import suggest_option
 
 
 class CfgWarning(WarningMessage):
     TOPIC = 'CFG'
 
 
+class UnknownCallMessage:
+    """
+    Mixin of the messages about calls which are not in the vocabulary of a parser.
+    The suggestion is only looked up when the message is formatted.
+    """
+
+    def __init__(self, name: str, position: tuple[int, int] | None = None):
+        super().__init__('Call "{}" is not known. {}', name, position=position)
+
+    def vocabulary(self) -> type[Enum]:
+        raise NotImplementedError('This is an abstract base class!')
+
+    def format(self) -> str:
+        name, = self.args
+        return self.template.format(name, suggest_option(name, self.vocabulary())).rstrip()
+
+
 class Call(LexicalNode):
 
-    def __init__(self, tokens: list[Token], parent: Node = None):
+    def __init__(self, tokens: list[Token], parent: Node = None, parser: type = None):
         LexicalNode.__init__(self, tokens, parent)
 
         self.name: str = self.raw().strip()
 
-        if self.name not in CfgParser.Call:
-            ENV.Diag.report(CfgWarning(f'Call "{self.name}" is not known.'))
+        # Calls are validated against the vocabulary of the parsed file type
+        parser = parser or CfgParser
+
+        if self.name not in parser.Call:
+            ENV.Diag.report(parser.UnknownCall(self.name))
 
 
 class Block(Node):
@@ -58,6 +79,10 @@ class Number(LexicalNode):
 
 class CfgParser(SwbfTextParser):
     Extension = Ext.Cfg
+    Version = 3
+    class UnknownCall(UnknownCallMessage, CfgWarning):
+        def vocabulary(self) -> type[Enum]:
+            return CfgParser.Call
 
     class Call(Enum):
         AmbientColor = 'AmbientColor'
@@ -115,7 +140,7 @@ class CfgParser(SwbfTextParser):
             elif self.get().type == TK.Word:
                 self.consume_until(TK.ParanthesisOpen)
 
-                call = Call(self.collect_tokens())
+                call = Call(self.collect_tokens(), parser=type(self))
                 self.add_to_scope(call)
 
                 self.discard() # (
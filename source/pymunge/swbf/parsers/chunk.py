@@ -0,0 +1,196 @@
+from pathlib import Path
+from struct import Struct
+
+from parxel.nodes import Node, BinaryNode
+from parxel.parser import BinaryParser
+
+from app.environment import MungeEnvironment as ENV
+from swbf.parsers.parser import ChunkMode, SwbfBinaryParser
+from util.logging import ScopedLogger, get_logger
+
+
+HEADER = Struct('<4sI')  # Name and length of the body
+
+
+def read_header(stream: BinaryParser) -> tuple[str, int]:
+    """
+    Returns the name and the body length of the chunk at the cursor of a stream without moving the cursor.
+    Raises :class:`struct.error` if the header is truncated.
+    """
+
+    name, length = HEADER.unpack_from(stream.buffer, stream.pos)
+    return name.decode('ascii', 'replace'), length
+
+
+class Chunk:
+    """
+    Node of a chunked binary file (e.g. MSH or UCFB). Every chunk starts with a header of a four letter name and
+    the length of its body.
+    """
+
+    TYPE = ''
+    FIELDS: tuple[str] = ()  # Attributes decoded from the body of the chunk
+
+    def __init__(self, stream: BinaryParser, header: tuple[str, int] | None = None):
+        # The walker passes the header it has already read
+        if header is None:
+            header = read_header(stream)
+
+        self.chunk_name, self.chunk_length = header
+        stream.pos += HEADER.size
+
+    def __getattr__(self, name: str):
+        # Only called for missing attributes, the body of an indexed chunk is decoded on first access of one of
+        # its fields or its bytes
+        if name in self.FIELDS or name == 'bytes':
+            index = self.__dict__.pop('_chunk_index', None)
+
+            if index is not None:
+                index.decode(self)
+                return getattr(self, name)
+
+        raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+
+    def hash(self, *tweak: str):
+        # The bytes of a mapped file are views, which are hashed by their content like bytes
+        return Node.hash(self, bytes(self.bytes), tweak)
+
+    def decode(self):
+        """
+        Decodes the body of an indexed chunk, chunks which are already decoded are left as they are.
+        """
+
+        index = self.__dict__.pop('_chunk_index', None)
+
+        if index is not None:
+            index.decode(self)
+
+
+class ChunkIndex:
+    """
+    Location of an indexed chunk in the buffer of its parser. The chunk is decoded by running the constructor
+    of its node at the offset of the chunk, the cursor of the parser is restored afterwards.
+    """
+
+    __slots__ = ('parser', 'offset')
+
+    def __init__(self, parser: BinaryParser, offset: int):
+        self.parser: BinaryParser = parser
+        self.offset: int = offset
+
+    def decode(self, node: Chunk):
+        parser = self.parser
+        cursor = parser.pos, parser.nbeg, parser.nend
+        parent = node.parent
+
+        parser.pos = parser.nend = self.offset
+
+        try:
+            type(node).__init__(node, parser, header=(node.chunk_name, node.chunk_length))
+        finally:
+            parser.pos, parser.nbeg, parser.nend = cursor
+            node.parent = parent
+
+
+class ChunkParser(SwbfBinaryParser):
+    """
+    Table driven parser of chunked binary files. The chunks which may appear in a file are declared by a grammar:
+
+    - :attr:`Root` lists the node types of the top level chunks.
+    - :attr:`Grammar` lists the node types of the children of each container chunk, all other chunks are leaves.
+
+    The grammar is compiled into dispatch tables by chunk name once per parser class. The walker reads the header
+    of every chunk once and constructs its node with that header and the cursor at the start of the chunk, the
+    constructor of the node does not read the header again. Leaves continue at the end declared by their header.
+    Containers end at the first chunk which is not one of their children, the parent continues with that chunk.
+
+    In :attr:`ChunkMode.Index` leaves are only indexed and decoded on first access, see :class:`ChunkIndex`.
+    """
+
+    Root: tuple[type] = ()
+    Grammar: dict[type, tuple[type]] = {}
+
+    Roots: dict[str, type] = {}
+    Dispatch: dict[type, dict[str, type]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls.Roots = {child.TYPE: child for child in cls.Root}
+        cls.Dispatch = {parent: {child.TYPE: child for child in children} for parent, children in cls.Grammar.items()}
+
+    def __init__(
+        self,
+        filepath: Path,
+        buffer: bytes | None = None,
+        logger: ScopedLogger = get_logger(__name__),
+        arrays: str | None = None,
+        chunks: str | None = None,
+        input_mode: str | None = None
+    ):
+        SwbfBinaryParser.__init__(
+            self, filepath=filepath, buffer=buffer, logger=logger, arrays=arrays, input_mode=input_mode
+        )
+
+        if chunks is None:
+            chunks = ENV.Args.chunks if ENV.Args else ChunkMode.Eager
+
+        self.chunks: str = chunks
+
+    def cacheable(self) -> bool:
+        # Indexed chunks keep a reference to the parser until they are decoded
+        return self.chunks != ChunkMode.Index
+
+    def _index_chunk(self, child_type: type, child_name: str, child_len: int) -> BinaryNode:
+        """
+        Creates the node of a leaf chunk without decoding its body.
+        """
+
+        node = child_type.__new__(child_type)
+        Node.__init__(node)
+
+        node.chunk_name = child_name
+        node.chunk_length = child_len
+        node._chunk_index = ChunkIndex(self, self.pos)
+
+        return node
+
+    def parse_format(self):
+        scopes: list[tuple[Node, dict[str, type]]] = [(self, self.Roots)]
+        index = self.chunks == ChunkMode.Index
+
+        while scopes and self.pos < len(self.buffer):
+            if self.pos + HEADER.size > len(self.buffer):
+                ENV.Diag.report(SwbfBinaryParser.TruncatedData(self, HEADER.size))
+                break
+
+            scope, children = scopes[-1]
+            child_name, child_len = header = read_header(self)
+            child_type = children.get(child_name)
+
+            # The chunk is not a child of the scope
+            if child_type is None:
+                scopes.pop()
+                continue
+
+            grandchildren = self.Dispatch.get(child_type)
+
+            # The chunk has children
+            if grandchildren is not None:
+                node = child_type(self, header=header)
+                scopes.append((node, grandchildren))
+
+            # The chunk is a leaf
+            else:
+                end = self.pos + HEADER.size + child_len
+
+                if index:
+                    node = self._index_chunk(child_type, child_name, child_len)
+                else:
+                    node = child_type(self, header=header)
+
+                self.pos = self.nend = end
+
+            scope.add(node)
+
+        return self
@@ -4,7 +4,7 @@ from pathlib import Path
 from parxel.token import Token
 
 from swbf.parsers.parser import Ext, SwbfTextParser
-from swbf.parsers.cfg import CfgParser
+from swbf.parsers.cfg import CfgParser, UnknownCallMessage
 from util.diagnostic import WarningMessage
 from util.enumeration import Enum
 from util.logging import get_logger
@@ -15,6 +15,9 @@ class FxWarning(WarningMessage):
 
 class FxParser(CfgParser):
     Extension = Ext.Fx
+    class UnknownCall(UnknownCallMessage, FxWarning):
+        def vocabulary(self) -> type[Enum]:
+            return FxParser.Call
 
     class Call(Enum):
         Alpha = 'Alpha'
@@ -1,14 +1,18 @@
-from pathlib import Path
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from parxel.nodes import Node, BinaryNode
 from parxel.parser import BinaryParser
 
-from swbf.parsers.parser import Ext, SwbfBinaryParser
-from util.logging import ScopedLogger, get_logger
+from swbf.parsers.chunk import Chunk, ChunkParser
+from swbf.parsers.parser import Ext
 
 
-class MshChunk:
-    TYPE = ''
+class MshChunk(Chunk):
 
     # Level 0
     HEDR = 'HEDR'
@@ -75,16 +79,12 @@ class MshChunk:
     UV0L = 'UV0L'
     WGHT = 'WGHT'
 
-    def __init__(self, msh_stream: BinaryParser):
-        self.chunk_name : str = msh_stream.string(4)
-        self.chunk_length : int = msh_stream.int32()
-
 
 class Header(MshChunk, BinaryNode):
     TYPE = MshChunk.HEDR
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
@@ -95,40 +95,41 @@ class Header(MshChunk, BinaryNode):
 class Animation(MshChunk, BinaryNode):
     TYPE = MshChunk.ANM2
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class BlendFactor(MshChunk, BinaryNode):
     TYPE = MshChunk.BLN2
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class ClosingChunk(MshChunk, BinaryNode):
     TYPE = MshChunk.CL1L
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Mesh(MshChunk, BinaryNode):
     TYPE = MshChunk.MSH2
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class ShadowVolume(MshChunk, BinaryNode):
     TYPE = MshChunk.SHVO
+    FIELDS = ('has_shadow_volume',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.has_shadow_volume = bool(msh_stream.int32())
 
@@ -138,8 +139,8 @@ class ShadowVolume(MshChunk, BinaryNode):
 class Skeleton(MshChunk, BinaryNode):
     TYPE = MshChunk.SKL2
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
@@ -148,9 +149,10 @@ class Skeleton(MshChunk, BinaryNode):
 
 class AnimationCycle(MshChunk, BinaryNode):
     TYPE = MshChunk.CYCL
+    FIELDS = ('num_animations', 'animations')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_animations: int = msh_stream.int32()
 
@@ -168,16 +170,17 @@ class AnimationCycle(MshChunk, BinaryNode):
 class Camera(MshChunk, BinaryNode):
     TYPE = MshChunk.CAMR
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Keyframes(MshChunk, BinaryNode):
     TYPE = MshChunk.KFR3
+    FIELDS = ('num_bones', 'keyframes')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_bones: int = msh_stream.int32()
 
@@ -208,8 +211,8 @@ class Keyframes(MshChunk, BinaryNode):
 class Material(MshChunk, BinaryNode):
     TYPE = MshChunk.MATL
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.materials : int = msh_stream.int32()
 
@@ -219,16 +222,16 @@ class Material(MshChunk, BinaryNode):
 class Model(MshChunk, BinaryNode):
     TYPE = MshChunk.MODL
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class SceneInformation(MshChunk, BinaryNode):
     TYPE = MshChunk.SINF
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
@@ -238,16 +241,16 @@ class SceneInformation(MshChunk, BinaryNode):
 class MaterialData(MshChunk, BinaryNode):
     TYPE = MshChunk.MATD
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Geometry(MshChunk, BinaryNode):
     TYPE = MshChunk.GEOM
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
@@ -257,39 +260,124 @@ class Geometry(MshChunk, BinaryNode):
 class ClothHeader(MshChunk, BinaryNode):
     TYPE = MshChunk.CLTH
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class SegmentHeader(MshChunk, BinaryNode):
     TYPE = MshChunk.SEGM
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Strip(MshChunk, BinaryNode):
     TYPE = MshChunk.STRP
+    FIELDS = ('num_indices', 'indices')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    RESTART = 0x8000  # Set on the first two indices of every strip
+
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_indices: int = msh_stream.int32()
-        self.polygons: list[int] = [msh_stream.int16() for _ in range(self.num_indices)]
+        self.indices: list[int] | memoryview = msh_stream.values(self.num_indices, 'H')
 
         # Skip potential padding (2 * 16 bits per entry for 32 bit alignment)
         msh_stream.advance((self.num_indices * 2) % 4)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
+    def triangles(self) -> list[tuple[int]] | memoryview:
+        """
+        Converts the strips to a triangle list. Every strip starts with two indices marked with :attr:`RESTART`,
+        each following index forms a triangle with the two indices before it. The winding of every second triangle
+        of a strip is flipped so that all triangles face the same side, degenerate triangles are dropped.
+
+        The conversion is vectorized if NumPy is installed. The triangles are a list of tuples, or a memoryview of
+        shape (n, 3) if the indices are a view.
+        """
+
+        if numpy is not None:
+            triangles = Strip.triangulate_array(self.indices)
+
+            if isinstance(self.indices, memoryview):
+                return memoryview(triangles)
+            return list(map(tuple, triangles.tolist()))
+
+        triangles = Strip.triangulate(self.indices)
+
+        if isinstance(self.indices, memoryview):
+            flat = array('H', (index for triangle in triangles for index in triangle))
+            return memoryview(flat).cast('B').cast('H', (len(triangles), 3))
+        return triangles
+
+    @staticmethod
+    def triangulate(indices: list[int] | memoryview) -> list[tuple[int]]:
+        triangles = []
+        start = 0
+        run = 0  # Marked indices in a row, a new strip starts at every second one
+
+        for position, index in enumerate(indices):
+            if index & Strip.RESTART:
+                if run % 2 == 0:
+                    start = position
+                run += 1
+                continue
+
+            run = 0
+            if position - start < 2:
+                continue
+
+            a = indices[position - 2] & ~Strip.RESTART
+            b = indices[position - 1] & ~Strip.RESTART
+            c = index
+
+            if a == b or b == c or a == c:
+                continue
+
+            triangles.append((b, a, c) if (position - start) % 2 else (a, b, c))
+
+        return triangles
+
+    @staticmethod
+    def triangulate_array(indices: list[int] | memoryview) -> 'numpy.ndarray':
+        """
+        Same as :meth:`triangulate` with array operations, returns an array of shape (n, 3).
+        """
+
+        strip = numpy.asarray(indices, dtype=numpy.uint16).reshape(-1)
+        restart = (strip & Strip.RESTART) != 0
+        strip = strip & ~numpy.uint16(Strip.RESTART)
+        positions = numpy.arange(len(strip))
+
+        # Position of every index in its run of marked indices, a new strip starts at every second one
+        run_start = numpy.maximum.accumulate(numpy.where(restart, 0, positions + 1))
+        first = restart & ((positions - run_start) % 2 == 0)
+        start = numpy.maximum.accumulate(numpy.where(first, positions, 0))
+
+        # Every unmarked index at least two positions into its strip completes a triangle
+        ends = numpy.flatnonzero(~restart)
+        offsets = ends - start[ends]
+        ends = ends[offsets >= 2]
+        odd = (offsets[offsets >= 2] % 2) == 1
+
+        a = strip[ends - 2]
+        b = strip[ends - 1]
+        c = strip[ends]
+
+        triangles = numpy.stack((numpy.where(odd, b, a), numpy.where(odd, a, b), c), axis=1)
+        return triangles[(a != b) & (b != c) & (a != c)]
+
 
 # Leaves
 
 
 class Attributes(MshChunk, BinaryNode):
     TYPE = MshChunk.ATRB
+    FIELDS = ('sum', 'render_type', 'data0', 'data1')
 
     Emissive = 1
     Glow = 2
@@ -300,8 +388,8 @@ class Attributes(MshChunk, BinaryNode):
     AdditiveTransparency = 64
     Specular = 128
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.sum: int = msh_stream.advance(1)[0]
         self.render_type: int = msh_stream.advance(1)[0]
@@ -313,21 +401,23 @@ class Attributes(MshChunk, BinaryNode):
 
 class BendConstraints(MshChunk, BinaryNode):
     TYPE = MshChunk.BPRS
+    FIELDS = ('num_constraints', 'constraints')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_constraints: int = msh_stream.int32()
-        self.constraints: list[list[int]]= [msh_stream.int16_array(2) for _ in range(self.num_constraints)]
+        self.constraints: list[tuple[int]] | memoryview = msh_stream.array(self.num_constraints, 2, 'H')
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class BoundingBox(MshChunk, BinaryNode):
     TYPE = MshChunk.BBOX
+    FIELDS = ('rotation', 'center', 'Extension', 'radius')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.rotation: list[float] = msh_stream.float32_array(4)
         self.center: list[float] = msh_stream.float32_array(3)
@@ -339,22 +429,24 @@ class BoundingBox(MshChunk, BinaryNode):
 
 class ClothMesh(MshChunk, BinaryNode):
     TYPE = MshChunk.CMSH
+    FIELDS = ('num_points', 'constraints')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         # TODO: is it 3 or 4 elements?
         self.num_points: int = msh_stream.int32()
-        self.constraints: list[list[float]]= [msh_stream.float32_array(3) for _ in range(self.num_points)]
+        self.constraints: list[tuple[float]] | memoryview = msh_stream.array(self.num_points, 3)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class ClothTextureName(MshChunk, BinaryNode):
     TYPE = MshChunk.CTEX
+    FIELDS = ('name',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.name: str = msh_stream.string(self.chunk_length)
 
@@ -363,33 +455,36 @@ class ClothTextureName(MshChunk, BinaryNode):
 
 class ClothUvCoordinates(MshChunk, BinaryNode):
     TYPE = MshChunk.CUV0
+    FIELDS = ('num_coordinates', 'coordinates')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_coordinates: int = msh_stream.int32()
-        self.coordinates: list[list[float]]= [msh_stream.float32_array(2) for _ in range(self.num_coordinates)]
+        self.coordinates: list[tuple[float]] | memoryview = msh_stream.array(self.num_coordinates, 2)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class ClothVertecies(MshChunk, BinaryNode):
     TYPE = MshChunk.CPOS
+    FIELDS = ('num_vertecies', 'constraints')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_vertecies: int = msh_stream.int32()
-        self.constraints: list[list[float]]= [msh_stream.float32_array(3) for _ in range(self.num_vertecies)]
+        self.constraints: list[tuple[float]] | memoryview = msh_stream.array(self.num_vertecies, 3)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Collision(MshChunk, BinaryNode):
     TYPE = MshChunk.COLL
+    FIELDS = ('num_collisions', 'collision_name', 'parent_name', 'primitive_type', 'data0', 'data1', 'data2')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         #TODO: name lengths, 64 for now
 
@@ -409,9 +504,10 @@ class Collision(MshChunk, BinaryNode):
 
 class CollisionPrimitive(MshChunk, BinaryNode):
     TYPE = MshChunk.SWCI
+    FIELDS = ('primitive_type', 'data0', 'data1', 'data2')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.primitive_type: int = msh_stream.int32()
         self.data0: float = msh_stream.float32()
@@ -423,9 +519,10 @@ class CollisionPrimitive(MshChunk, BinaryNode):
 
 class ColorVertex(MshChunk, BinaryNode):
     TYPE = MshChunk.CLRB
+    FIELDS = ('colors',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.colors: bytes = msh_stream.bytes(4)
 
@@ -434,9 +531,10 @@ class ColorVertex(MshChunk, BinaryNode):
 
 class ColorVertecies(MshChunk, BinaryNode):
     TYPE = MshChunk.CLRL
+    FIELDS = ('num_colors', 'colors')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_colors: int = msh_stream.int32()
         self.colors: list[bytes] = [msh_stream.bytes(4) for _ in range(self.num_colors)]
@@ -446,21 +544,23 @@ class ColorVertecies(MshChunk, BinaryNode):
 
 class CrossConstraints(MshChunk, BinaryNode):
     TYPE = MshChunk.CPRS
+    FIELDS = ('num_coordinates', 'coordinates')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_coordinates: int = msh_stream.int32()
-        self.coordinates: list[list[float]]= [msh_stream.float32_array(3) for _ in range(self.num_coordinates)]
+        self.coordinates: list[tuple[float]] | memoryview = msh_stream.array(self.num_coordinates, 3)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class DataCamera(MshChunk, BinaryNode):
     TYPE = MshChunk.DATA
+    FIELDS = ('_todo',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         # TODO
         self._todo : bytes = msh_stream.advance(self.chunk_length)
@@ -470,9 +570,10 @@ class DataCamera(MshChunk, BinaryNode):
 
 class DataMaterial(MshChunk, BinaryNode):
     TYPE = MshChunk.DATA
+    FIELDS = ('diffuse_color', 'specular_color', 'ambient_color', 'specular_sharpness')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.diffuse_color : list[float] = msh_stream.float32_array(4)
         self.specular_color : list[float] = msh_stream.float32_array(4)
@@ -484,9 +585,10 @@ class DataMaterial(MshChunk, BinaryNode):
 
 class Envelope(MshChunk, BinaryNode):
     TYPE = MshChunk.ENVL
+    FIELDS = ('num_indices', 'indices')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_indices : int = msh_stream.int32()
         self.indices : list[int] = msh_stream.int32_array(self.num_indices)
@@ -496,9 +598,10 @@ class Envelope(MshChunk, BinaryNode):
 
 class FixPoints(MshChunk, BinaryNode):
     TYPE = MshChunk.FIDX
+    FIELDS = ('num_points', 'indices')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_points : int = msh_stream.int32()
         self.indices : list[int] = msh_stream.int32_array(self.num_indices)
@@ -508,9 +611,10 @@ class FixPoints(MshChunk, BinaryNode):
 
 class FixPointWeights(MshChunk, BinaryNode):
     TYPE = MshChunk.FWGT
+    FIELDS = ('num_points', 'weights')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         # TODO: string size
 
@@ -522,6 +626,7 @@ class FixPointWeights(MshChunk, BinaryNode):
 
 class FlagsModel(MshChunk, BinaryNode):
     TYPE = MshChunk.FLGS
+    FIELDS = ('flags',)
 
     Hidden = 1
     DynamicallyLit = 2
@@ -530,8 +635,8 @@ class FlagsModel(MshChunk, BinaryNode):
     DontFlattenGeometry = 16
     PS2Optimize = 32
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.flags : int = msh_stream.int32()
 
@@ -540,9 +645,10 @@ class FlagsModel(MshChunk, BinaryNode):
 
 class Frame(MshChunk, BinaryNode):
     TYPE = MshChunk.FRAM
+    FIELDS = ('frame_start', 'frame_end', 'fps')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.frame_start: int = msh_stream.int32()
         self.frame_end: int = msh_stream.int32()
@@ -553,9 +659,10 @@ class Frame(MshChunk, BinaryNode):
 
 class Name(MshChunk, BinaryNode):
     TYPE = MshChunk.NAME
+    FIELDS = ('name',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.name: str = msh_stream.string(self.chunk_length)
 
@@ -564,21 +671,23 @@ class Name(MshChunk, BinaryNode):
 
 class Normals(MshChunk, BinaryNode):
     TYPE = MshChunk.NRML
+    FIELDS = ('num_normals', 'normals')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_normals: int = msh_stream.int32()
-        self.normals: list[list[float]] = [msh_stream.float32_array(3) for _ in range(self.num_normals)]
+        self.normals: list[tuple[float]] | memoryview = msh_stream.array(self.num_normals, 3)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class MaterialIndex(MshChunk, BinaryNode):
     TYPE = MshChunk.MATI
+    FIELDS = ('material_index',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.material_index : int = msh_stream.int32()
 
@@ -587,9 +696,10 @@ class MaterialIndex(MshChunk, BinaryNode):
 
 class ModelIndex(MshChunk, BinaryNode):
     TYPE = MshChunk.MNDX
+    FIELDS = ('model_index',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.model_index : int = msh_stream.int32()
 
@@ -598,6 +708,7 @@ class ModelIndex(MshChunk, BinaryNode):
 
 class ModelType(MshChunk, BinaryNode):
     TYPE = MshChunk.MTYP
+    FIELDS = ('model_type',)
 
     Null = 0
     Dynamic = 1
@@ -607,8 +718,8 @@ class ModelType(MshChunk, BinaryNode):
     ShadowVolume = 6
     Destructable = 7
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.model_type : int = msh_stream.int32()
 
@@ -617,9 +728,10 @@ class ModelType(MshChunk, BinaryNode):
 
 class ParentModel(MshChunk, BinaryNode):
     TYPE = MshChunk.PRNT
+    FIELDS = ('name',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.name : str = msh_stream.string(self.chunk_length)
 
@@ -628,59 +740,71 @@ class ParentModel(MshChunk, BinaryNode):
 
 class Polygons(MshChunk, BinaryNode):
     TYPE = MshChunk.NDXL
+    FIELDS = ('num_polygons', 'polygons')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
-        # TODO
-        self.todo = msh_stream.bytes(self.chunk_length)
+        end = msh_stream.pos + self.chunk_length
+
+        self.num_polygons: int = msh_stream.int32()
+        self.polygons: list[tuple[int]] = [
+            tuple(msh_stream.values(msh_stream.int16(), 'H')) for _ in range(self.num_polygons)
+        ]
+
+        # Skip potential padding to the end of the chunk
+        msh_stream.advance(end - msh_stream.pos)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class PositionVertices(MshChunk, BinaryNode):
     TYPE = MshChunk.POSL
+    FIELDS = ('num_positions', 'positions')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_positions : int = msh_stream.int32()
-        self.positions : list[list[float]] = [msh_stream.float32_array(3) for _ in range(self.num_positions)]
+        self.positions : list[tuple[float]] | memoryview = msh_stream.array(self.num_positions, 3)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class ShadowMesh(MshChunk, BinaryNode):
     TYPE = MshChunk.SHDW
+    FIELDS = ('num_vertices', 'vertices', 'num_edges', 'edges')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_vertices: int = msh_stream.int32()
-        self.vertices: list[list[float]] = [msh_stream.float32_array(3) for _ in range(self.num_vertices)]
+        self.vertices: list[tuple[float]] | memoryview = msh_stream.array(self.num_vertices, 3)
         self.num_edges: int = msh_stream.int32()
-        self.edges: list[list[int]] = [msh_stream.int16_array(4) for _ in range(self.num_edges)]
+        self.edges: list[tuple[int]] | memoryview = msh_stream.array(self.num_edges, 4, 'H')
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class StretchConstraints(MshChunk, BinaryNode):
     TYPE = MshChunk.SPRS
+    FIELDS = ('num_constraints', 'constraints')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_constraints: int = msh_stream.int32()
-        self.constraints: list[list[int]] = [msh_stream.int16_array(2) for _ in range(self.num_constraints)]
+        self.constraints: list[tuple[int]] | memoryview = msh_stream.array(self.num_constraints, 2, 'H')
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class Texture(MshChunk, BinaryNode):
     TYPE = MshChunk.TX0D
+    FIELDS = ('name',)
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.name: str = msh_stream.string(self.chunk_length)
 
@@ -689,9 +813,10 @@ class Texture(MshChunk, BinaryNode):
 
 class TransformModel(MshChunk, BinaryNode):
     TYPE = MshChunk.TRAN
+    FIELDS = ('scale', 'rotation', 'translation')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.scale : list[float] = msh_stream.float32_array(3)
         self.rotation : list[float] = msh_stream.float32_array(4)
@@ -702,215 +827,97 @@ class TransformModel(MshChunk, BinaryNode):
 
 class Triangles(MshChunk, BinaryNode):
     TYPE = MshChunk.NDXT
+    FIELDS = ('num_triangles', 'triangles')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
-        # TODO
-        self.todo = msh_stream.bytes(self.chunk_length)
+        end = msh_stream.pos + self.chunk_length
+
+        self.num_triangles: int = msh_stream.int32()
+        self.triangles: list[tuple[int]] | memoryview = msh_stream.array(self.num_triangles, 3, 'H')
+
+        # Skip potential padding to the end of the chunk
+        msh_stream.advance(end - msh_stream.pos)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class UvCoordinates(MshChunk, BinaryNode):
     TYPE = MshChunk.UV0L
+    FIELDS = ('num_coordinates', 'coordinates')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_coordinates : int = msh_stream.int32()
-        self.coordinates : list[list[float]] = [msh_stream.float32_array(2) for _ in range(self.num_coordinates)]
+        self.coordinates : list[tuple[float]] | memoryview = msh_stream.array(self.num_coordinates, 2)
 
         BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
 
 class WeightBones(MshChunk, BinaryNode):
     TYPE = MshChunk.WGHT
+    FIELDS = ('num_weights', 'bones', 'factors')
 
-    def __init__(self, msh_stream: BinaryParser, parent: Node = None):
-        MshChunk.__init__(self, msh_stream)
+    def __init__(self, msh_stream: BinaryParser, parent: Node = None, header: tuple[str, int] | None = None):
+        MshChunk.__init__(self, msh_stream, header)
 
         self.num_weights : int = msh_stream.int32()
-        self.weights : list[tuple[int, float]] = [(msh_stream.int32(), msh_stream.float32()) for _ in range(self.num_weights * 4)]
-
-        BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
+        count = self.num_weights * 4
 
+        # Rows of (bone index, weight factor) read twice, the bones are the even and the factors the odd values
+        start = msh_stream.pos
+        self.bones : list[int] | memoryview = msh_stream.values(count * 2, 'I')[0::2]
+        msh_stream.pos = start
+        self.factors : list[float] | memoryview = msh_stream.values(count * 2, 'f')[1::2]
 
-class MshParser(SwbfBinaryParser):
-    Extension = Ext.Msh
-
-    def __init__(self, filepath: Path, buffer: bytes = None, logger : ScopedLogger = get_logger(__name__)):
-        SwbfBinaryParser.__init__(self, filepath=filepath, buffer=buffer, logger=logger)
-
-    def _parse_chunk(self, children: dict) -> BinaryNode | Node | None:
-        child_name = self.string(4)
-        child_len = self.int32()
-        self.pos -= 8
-
-        parse_children, child_type = children.get(child_name, (None, None))
-
-        # The chunk is a valid child
-        if child_type:
-            node = child_type(self)
-            self.scope.add(node)
-        else:
-            if hasattr(self.scope, 'parent') and self.scope.parent:
-                self.scope = self.scope.parent
-            return None
-
-        # The chunk has children
-        if parse_children:
-            self.scope = node
-            parse_children()
-            return self.scope
-
-        # The chunk is a leaf
-        else:
-            return self.scope
-
-    def parse_format(self):
-        self._parse_chunk({
-            MshChunk.HEDR: (self.parse_hedr, Header)
-        })
-
-        return self
-
-    # Level 0
-
-    def parse_hedr(self):
-        while self._parse_chunk({
-            MshChunk.ANM2: (self.parse_anm2, Animation),
-            MshChunk.BLN2: (None, BlendFactor),
-            MshChunk.CL1L: (None, ClosingChunk),
-            MshChunk.MSH2: (self.parse_msh2, Mesh),
-            MshChunk.SKL2: (None, Skeleton),
-            MshChunk.SHVO: (None, ShadowVolume),
-        }):
-            pass
-
-    # Level 1
-
-    def parse_anm2(self):
-        while self._parse_chunk({
-            MshChunk.CYCL: (self.parse_camr, AnimationCycle),
-            MshChunk.KFR3: (self.parse_matl, Keyframes),
-        }):
-            pass
-
-    def parse_msh2(self):
-        while self._parse_chunk({
-            MshChunk.CAMR: (self.parse_camr, Camera),
-            MshChunk.MATL: (self.parse_matl, Material),
-            MshChunk.MODL: (self.parse_modl, Model),
-            MshChunk.SINF: (self.parse_sinf, SceneInformation),
-        }):
-            pass
-
-    def parse_shv0(self):
-        pass
-
-    def parse_skl2(self):
-        pass
-
-    # Level 2
-
-    def parse_camr(self):
-        while self._parse_chunk({
-            MshChunk.DATA: (None, DataCamera),
-            MshChunk.NAME: (None, Name),
-        }):
-            pass
-
-    def parse_matl(self):
-        while self._parse_chunk({
-            MshChunk.MATD: (self.parse_matd, MaterialData),
-        }):
-            pass
-
-    def parse_modl(self):
-        while self._parse_chunk({
-            MshChunk.FLGS: (None, FlagsModel),
-            MshChunk.GEOM: (self.parse_geom, Geometry),
-            MshChunk.NAME: (None, Name),
-            MshChunk.MNDX: (None, ModelIndex),
-            MshChunk.MTYP: (None, ModelType),
-            MshChunk.PRNT: (None, ParentModel),
-            MshChunk.SWCI: (None, CollisionPrimitive),
-            MshChunk.TRAN: (None, TransformModel)
-        }):
-            pass
-
-    def parse_sinf(self):
-        while self._parse_chunk({
-            MshChunk.BBOX: (None, BoundingBox),
-            MshChunk.FRAM: (None, Frame),
-            MshChunk.NAME: (None, Name)
-        }):
-            pass
-
-    # Level 3
+        BinaryNode.__init__(self, msh_stream.collect_bytes(), parent)
 
-    def parse_geom(self):
-        while self._parse_chunk({
-            MshChunk.BBOX: (None, BoundingBox),
-            MshChunk.CLTH: (self.parse_clth, ClothHeader),
-            MshChunk.ENVL: (None, Envelope),
-            MshChunk.SEGM: (self.parse_segm, SegmentHeader)
-        }):
-            pass
-
-    def parse_matd(self):
-        while self._parse_chunk({
-            MshChunk.ATRB: (None, Attributes),
-            MshChunk.NAME: (None, Name),
-            MshChunk.DATA: (None, DataMaterial),
-            MshChunk.TX0D: (None, Texture)
-        }):
-            pass
+    @property
+    def weights(self) -> list[tuple[int, float]]:
+        return list(zip(self.bones, self.factors))
 
-    # Level 4
 
-    def parse_segm(self):
-        while self._parse_chunk({
-            MshChunk.CLRB: (None, ColorVertex),
-            MshChunk.CLRL: (None, ColorVertecies),
-            MshChunk.MATI: (None, MaterialIndex),
-            MshChunk.NDXL: (None, Polygons),
-            MshChunk.NDXT: (None, Triangles),
-            MshChunk.NRML: (None, Normals),
-            MshChunk.POSL: (None, PositionVertices),
-            MshChunk.SHDW: (None, ShadowMesh),
-            MshChunk.STRP: (self.parse_strp, Strip),
-            MshChunk.UV0L: (None, UvCoordinates),
-            MshChunk.WGHT: (None, WeightBones)
-        }):
-            pass
-
-    def parse_clth(self):
-        while self._parse_chunk({
+class MshParser(ChunkParser):
+    Extension = Ext.Msh
+    Version = 5
+
+    Root = (Header,)
+
+    # yapf: disable
+    Grammar = {
+        # Level 0
+        Header: (Animation, BlendFactor, ClosingChunk, Mesh, Skeleton, ShadowVolume),
+
+        # Level 1
+        Animation: (AnimationCycle, Keyframes),
+        Mesh: (Camera, Material, Model, SceneInformation),
+
+        # Level 2
+        Camera: (DataCamera, Name),
+        Material: (MaterialData,),
+        Model: (
+            FlagsModel, Geometry, Name, ModelIndex, ModelType, ParentModel, CollisionPrimitive, TransformModel
+        ),
+        SceneInformation: (BoundingBox, Frame, Name),
+
+        # Level 3
+        Geometry: (BoundingBox, ClothHeader, Envelope, SegmentHeader),
+        MaterialData: (Attributes, Name, DataMaterial, Texture),
+
+        # Level 4
+        SegmentHeader: (
+            ColorVertex, ColorVertecies, MaterialIndex, Polygons, Triangles, Normals, PositionVertices, ShadowMesh,
+            Strip, UvCoordinates, WeightBones
+        ),
+        ClothHeader: (
             # TODO
-            MshChunk.BPRS: (None, BendConstraints),
-            MshChunk.CMSH: (None, ClothMesh),
-            MshChunk.COLL: (None, Collision),
-            MshChunk.CPOS: (None, ClothVertecies),
-            MshChunk.CPRS: (None, CrossConstraints),
-            MshChunk.CTEX: (None, ClothTextureName),
-            MshChunk.CUV0: (None, ClothUvCoordinates),
-            MshChunk.FIDX: (None, FixPoints),
-            MshChunk.FWGT: (None, FixPointWeights),
-            MshChunk.SPRS: (None, StretchConstraints)
-        }):
-            pass
-
-    # Level 5
-
-    def parse_strp(self):
-        while self._parse_chunk({
-            MshChunk.BBOX: (None, BoundingBox),
-            MshChunk.FRAM: (None, Frame),
-            MshChunk.NAME: (None, Name)
-        }):
-            pass
+            BendConstraints, ClothMesh, Collision, ClothVertecies, CrossConstraints, ClothTextureName,
+            ClothUvCoordinates, FixPoints, FixPointWeights, StretchConstraints
+        )
+    }
+    # yapf: enable
 
 
 if __name__ == '__main__':
@@ -1,22 +1,27 @@
-from difflib import get_close_matches
 from logging import Logger
 from pathlib import Path
 import re
 
+from parxel.lexer import Lexer
 from parxel.nodes import Node, LexicalNode
+from parxel.parser import Parser
 from parxel.token import TK, Token
 
 from app.environment import MungeEnvironment as ENV
-from swbf.parsers.parser import Ext, SwbfTextParser
+from swbf.parsers.parser import Ext, ParserMode, SwbfParser, SwbfTextParser
 from util.diagnostic import WarningMessage
 from util.enumeration import Enum
 from util.logging import get_logger
+from util.suggestion import suggest_option
 
 
 class OdfNode(LexicalNode):
     def __init__(self, tokens: list[Token], parent: Node = None):
         super().__init__(tokens, parent)
 
+    def position(self) -> tuple[int, int] | None:
+        return (self.tokens[0].row, self.tokens[0].col) if self.tokens else None
+
 
 class Comment(OdfNode):
 
@@ -34,7 +39,7 @@ class Key(OdfNode):
         self.name: str = self.raw().strip()
 
         if self.name not in OdfParser.Key:
-            ENV.Diag.report(OdfParser.UnknownKey(self.name))
+            ENV.Diag.report(OdfParser.UnknownKey(self.name, self.position()))
 
 
 class Value(OdfNode):
@@ -65,48 +70,31 @@ class Section(OdfNode):
         self.name: str = self.raw().strip()
 
         if self.name not in OdfParser.Section:
-            ENV.Diag.report(OdfParser.UnknownSection(self.name))
-
-
-from difflib import SequenceMatcher
-
-def get_best_matches(word, desired, n=3, cutoff=0.8):
-    word_lower = word.lower()
-    scored = []
-
-    for candidate in desired:
-        ratio = SequenceMatcher(None, word_lower, candidate.lower()).ratio()
-        if ratio >= cutoff:
-            scored.append((ratio, candidate))
-
-    # sort by ratio (descending), then by name for stability
-    scored.sort(key=lambda x: (-x[0], x[1]))
-
-    return [candidate for _, candidate in scored[:n]]
-
-
-def suggest_option(needle: str, haystack: list):
-    matches = get_best_matches(needle, haystack)
-    if not matches:
-        return ''
-    filler = '' if len(matches) == 1 else 'one of '
-    suggestions = ', '.join(f'"{option}"' for option in matches)
-    return f'Did you mean {filler}{suggestions}?'
+            ENV.Diag.report(OdfParser.UnknownSection(self.name, self.position()))
 
 
 class OdfParser(SwbfTextParser):
     Extension = Ext.Odf
+    Version = 2
 
     class OdfDiagnosticMessage:
         TOPIC = 'ODF'
 
     class UnknownKey(OdfDiagnosticMessage, WarningMessage):
-        def __init__(self, key: str):
-            super().__init__(f'Key name "{key}" is not known. {suggest_option(key, OdfParser.Key)}')
+        def __init__(self, key: str, position: tuple[int, int] | None = None):
+            super().__init__('Key name "{}" is not known. {}', key, position=position)
+
+        def format(self) -> str:
+            key, = self.args
+            return self.template.format(key, suggest_option(key, OdfParser.Key))
 
     class UnknownSection(OdfDiagnosticMessage, WarningMessage):
-        def __init__(self, section: str):
-            super().__init__(f'Section name "{section}" is not known. {suggest_option(section, OdfParser.Section)}')
+        def __init__(self, section: str, position: tuple[int, int] | None = None):
+            super().__init__('Section name "{}" is not known. {}', section, position=position)
+
+        def format(self) -> str:
+            section, = self.args
+            return self.template.format(section, suggest_option(section, OdfParser.Section))
 
     class Section(Enum):
         ExplosionClass = 'ExplosionClass'
@@ -1151,12 +1139,165 @@ class OdfParser(SwbfTextParser):
         Key.WeaponSection
     }
 
-    def __init__(self, filepath: Path, tokens: list[Token] = None, logger: Logger = get_logger(__name__)):
-        SwbfTextParser.__init__(self, filepath=filepath, tokens=tokens, logger=logger)
+    # A line which is parsed the same way by the token parser. Keys and values are separated by '=' and whitespaces,
+    # unquoted values end at a comment or the end of the line.
+    # yapf: disable
+    RE_LINE = re.compile(
+        r'[ \t\v\r]*(?:'
+        r'\[(?P<section>[^\]\n]*)\][ \t\v\r]*|'
+        r'(?P<key>[A-Za-z_]\w*+)(?P<separator>[ \t\v\r=]*+)'
+        r'(?:(?P<quoted>"[^"\n]*")[ \t\v\r]*|(?P<value>[^"/\\\n \t\v\r=][^/\\\n]*)?)'
+        r')?'
+        r'(?:[/\\]{2}(?P<comment>.*))?',
+        re.ASCII
+    )
+    # yapf: enable
+
+    # Words and numbers, the only tokens of the lexer with more than one character
+    RE_RUN = re.compile(r'[A-Za-z_]\w*|\d+', re.ASCII)
+
+    def __init__(
+        self,
+        filepath: Path,
+        tokens: list[Token] = None,
+        logger: Logger = get_logger(__name__),
+        mode: str | None = None
+    ):
+        if mode is None:
+            mode = ENV.Args.parser if ENV.Args else ParserMode.Fast
+
+        self.text: str = ''
+
+        if mode == ParserMode.Fast and not tokens:
+            with filepath.open('r') as file:
+                self.text = file.read()
+
+        if self.text:
+            # The file is only tokenized if the fast path fails
+            SwbfParser.__init__(self, filepath=filepath, logger=logger)
+            Parser.__init__(self, iterable=[], filepath=filepath, logger=logger)
+        else:
+            SwbfTextParser.__init__(self, filepath=filepath, tokens=tokens, logger=logger)
 
         self.curr = self
 
     def parse_format(self):
+        if self.text:
+            if self.parse_lines():
+                return self
+
+            self.logger.debug(f'Falling back to the token parser for "{self.filepath}"')
+            Parser.__init__(
+                self, iterable=Lexer(stream=self.text).tokenize(), filepath=self.filepath, logger=self.logger
+            )
+
+        return self.parse_tokens()
+
+    def parse_lines(self) -> bool:
+        """
+        Parses the raw lines of the file into the same nodes as :meth:`parse_tokens`. Returns False without
+        creating any node if a line is not well-formed, the file has to be parsed from its tokens then.
+        The tokens get the rows and columns of the lexer, so diagnostics are reported at the same positions.
+        """
+
+        lines = []
+        offset = 0
+        row = 0
+
+        for line in self.text.split('\n'):
+            match = OdfParser.RE_LINE.fullmatch(line)
+
+            # A key without a value continues in the next line
+            if not match or (
+                match['key'] and match['quoted'] is None and match['value'] is None and match['comment'] is None
+            ):
+                return False
+
+            lines.append((offset, row, line, match))
+            row += OdfParser.line_feeds(line, offset)
+            offset += len(line) + 1
+
+        def tokens(offset: int, row: int, line: str, match: re.Match, group: str) -> list[Token]:
+            beg, end = match.span(group)
+
+            if end <= beg:
+                return []
+
+            row, col = self.lexer_position(line, row, beg, offset == 0, offset + len(line) == len(self.text))
+            return [Token(offset + beg, offset + end, row, col, TK.Undefined, match[group])]
+
+        active_node = self
+
+        for offset, row, line, match in lines:
+            if match['section'] is not None:
+                if self.curr != self:
+                    self.curr = self.curr.parent
+
+                section = Section(tokens(offset, row, line, match, 'section'))
+                self.curr = section
+                self.add(section)
+
+                active_node = section
+
+            elif match['key']:
+                key = Key(tokens(offset, row, line, match, 'key'))
+                self.curr.add(key)
+
+                if match['quoted'] is not None:
+                    value_tokens = tokens(offset, row, line, match, 'quoted')
+                else:
+                    value_tokens = tokens(offset, row, line, match, 'value')
+
+                if match['quoted'] and re.match(Reference.RE_FILE, match['quoted']) is not None:
+                    reference = Reference(self.filepath.parent, value_tokens)
+                    key.add(reference)
+                    ENV.Reg.add_link(self.filepath, reference.filepath)
+
+                else:
+                    value = Value(value_tokens)
+                    key.add(value)
+
+                active_node = key
+
+            # A comment consumes its line feed, the next line continues with the same active node
+            if match['comment'] is not None:
+                comment = Comment(tokens(offset, row, line, match, 'comment'))
+                active_node.add(comment)
+            else:
+                active_node = self.curr
+
+        return True
+
+    @staticmethod
+    def line_feeds(line: str, offset: int) -> int:
+        """
+        Returns the number of rows which the lexer counts for the line feed at the end of a line. The line feed
+        after a word or a number is counted twice, a line feed at the start of the file is not counted.
+        """
+
+        if offset == 0 and not line:
+            return 0
+
+        return 2 if OdfParser.RE_RUN.match(line[-1:]) else 1
+
+    @staticmethod
+    def lexer_position(line: str, row: int, col: int, first: bool, last: bool) -> tuple[int, int]:
+        """
+        Returns the row and column which the lexer assigns to the token at column `col` of a line in lexer row `row`.
+        The lexer reports the column after the token and counts the character after every word or number twice.
+        Only the columns of the first line start at 0.
+        """
+
+        run = OdfParser.RE_RUN.match(line, col)
+
+        # A word or a number at the end of the line is reported at the start of the next row
+        if run and run.end() == len(line) and not last:
+            return row + 1, 0
+
+        end = run.end() if run else col
+        return row, end + (0 if first else 1) + len(OdfParser.RE_RUN.findall(line, 0, col))
+
+    def parse_tokens(self):
         active_node = self
 
         while self:
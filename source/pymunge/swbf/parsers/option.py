@@ -24,7 +24,7 @@ class Switch(LexicalNode):
         self.value: str = self.raw().strip()
 
         if self.value not in OptionParser.Switch:
-            ENV.Diag.report(OptWarning(f'Switch "{self.value}" is not known.'))
+            ENV.Diag.report(OptWarning('Switch "{}" is not known.', self.value))
 
 
 class Value(LexicalNode):
@@ -36,7 +36,7 @@ class Value(LexicalNode):
         self.value: str = self.raw().strip()
 
         if self.value not in OptionParser.Value and not re.match(Value.RE_NUMBER, self.value):
-            ENV.Diag.report(OptWarning(f'Value "{self.value}" is not known.'))
+            ENV.Diag.report(OptWarning('Value "{}" is not known.', self.value))
 
         if isinstance(self.parent, Switch):
             valid_values = OptionParser.SwitchValue[self.parent.value]
@@ -44,12 +44,12 @@ class Value(LexicalNode):
             if isinstance(valid_values, list):
                 if self.value not in valid_values:
                     ENV.Diag.report(
-                        OptWarning(f'Value "{self.value}" is not a valid value for {self.parent.value}.')
+                        OptWarning('Value "{}" is not a valid value for {}.', self.value, self.parent.value)
                     )
             else:
                 if not re.match(OptionParser.SwitchValue[self.parent.value], self.value):
                     ENV.Diag.report(
-                        OptWarning(f'Value "{self.value}" is not a valid value for {self.parent.value}.')
+                        OptWarning('Value "{}" is not a valid value for {}.', self.value, self.parent.value)
                     )
 
 
@@ -1,10 +1,13 @@
 import io
+from mmap import ACCESS_READ, mmap
+from os import fstat
 from pathlib import Path
+from struct import calcsize, iter_unpack, unpack
 import sys
 
 from parxel.lexer import Lexer
 from parxel.nodes import Document
-from parxel.parser import BinaryParser, TextParser
+from parxel.parser import BinaryParser, Parser, TextParser
 from parxel.token import Token
 
 from app.environment import MungeEnvironment as ENV
@@ -44,14 +47,69 @@ class Ext(Enum):
     Zaf = 'zaf'
 
 
+class ParserMode(Enum):
+    """
+    Text parsers with a fast path scan the raw lines of a file and only tokenize malformed files.
+    """
+
+    Fast = 'fast'
+    Token = 'token'
+
+
+class ArrayMode(Enum):
+    """
+    Binary parsers decode arrays of numbers into lists of tuples or expose them as views over the bytes of the file.
+    """
+
+    List = 'list'
+    View = 'view'
+
+
+class ChunkMode(Enum):
+    """
+    Chunked binary parsers decode every chunk while parsing or index the leaf chunks and decode them on first access.
+    """
+
+    Eager = 'eager'
+    Index = 'index'
+
+
+class InputMode(Enum):
+    """
+    Binary parsers read files into a buffer or map them into memory. Nodes of a mapped file keep views of the mapping.
+    """
+
+    Read = 'read'
+    Map = 'mmap'
+
+
 class SwbfParser(Document):
     Extension = ''
+    Version = 1  # Layout of the parsed tree, cached trees of other versions are parsed again
 
     def __init__(self, filepath: Path, logger: ScopedLogger = get_logger(__name__)) -> None:
         Document.__init__(self, filepath=filepath)
 
         self.logger: ScopedLogger = logger
 
+    @classmethod
+    def empty(cls: type, filepath: Path, logger: ScopedLogger = get_logger(__name__)):
+        """
+        Creates a parser without reading the file, used as the root of a tree restored from the :class:`TreeCache`.
+        """
+
+        parser = cls.__new__(cls)
+        Parser.__init__(parser, iterable=[], filepath=filepath, logger=logger)
+        SwbfParser.__init__(parser, filepath=filepath, logger=logger)
+        return parser
+
+    def cacheable(self) -> bool:
+        """
+        Returns whether the parsed tree can be stored in the :class:`TreeCache`.
+        """
+
+        return True
+
     @classmethod
     def cmd_helper(cls: type):
         # Stub
@@ -109,7 +167,7 @@ class SwbfTextParser(TextParser, SwbfParser):
                 f'Unrecognized token in file {parser.filepath} at position {parser.token_position()}:'
                 f'"{parser.get()} ({parser.get().type}) ({parser.tokens()})" [...{text}...]'
             )
-            super().__init__(error)
+            super().__init__(error, position=(parser.get().row, parser.get().col))
 
     def __init__(self, filepath: Path, tokens: list[Token] | None = None, logger: ScopedLogger = get_logger(__name__)):
 
@@ -123,11 +181,109 @@ class SwbfTextParser(TextParser, SwbfParser):
 
 class SwbfBinaryParser(BinaryParser, SwbfParser):
 
-    def __init__(self, filepath: Path, buffer: bytes | None = None, logger: ScopedLogger = get_logger(__name__)):
+    class TruncatedData(ErrorMessage):
+        TOPIC = 'PAR'
+
+        def __init__(self, parser: BinaryParser, length: int):
+            available = max(0, len(parser.buffer) - parser.pos)
+            super().__init__(
+                'Unexpected end of file {} at offset {}: Expected {} bytes, got {}', str(parser.filepath), parser.pos,
+                length, available
+            )
+
+    def __init__(
+        self,
+        filepath: Path,
+        buffer: bytes | None = None,
+        logger: ScopedLogger = get_logger(__name__),
+        arrays: str | None = None,
+        input_mode: str | None = None
+    ):
 
         SwbfParser.__init__(self, filepath=filepath, logger=logger)
         Document.__init__(self, filepath=filepath)
-        BinaryParser.__init__(self, filepath=filepath, buffer=buffer, logger=logger)
+
+        if input_mode is None:
+            input_mode = ENV.Args.input if ENV.Args else InputMode.Read
+
+        mapped = SwbfBinaryParser.map(filepath) if buffer is None and input_mode == InputMode.Map else None
+
+        if mapped is not None:
+            BinaryParser.__init__(self, buffer=mapped, logger=logger)
+        else:
+            BinaryParser.__init__(self, filepath=filepath, buffer=buffer, logger=logger)
+
+        if arrays is None:
+            arrays = ENV.Args.arrays if ENV.Args else ArrayMode.List
+
+        self.arrays: str = arrays
+        self.input_mode: str = input_mode
+
+    @staticmethod
+    def map(filepath: Path) -> memoryview | None:
+        """
+        Returns a read-only view of a memory mapped file, or None for empty files which can not be mapped.
+
+        The mapping is released once the parser and all views of it (e.g. the bytes of the nodes) are collected.
+        """
+
+        with filepath.open('rb') as file:
+            if fstat(file.fileno()).st_size == 0:
+                return None
+
+            return memoryview(mmap(file.fileno(), 0, access=ACCESS_READ))
+
+    def array(self, count: int, size: int, format: str = 'f') -> list[tuple] | memoryview:
+        """
+        Reads `count` rows of `size` little endian numbers of a :mod:`struct` format (e.g. 'f', 'H' or 'I').
+
+        In :attr:`ArrayMode.View` the rows are a memoryview of shape (count, size) over the buffer of the file.
+        Nothing is copied, `numpy.asarray(view)` is an array of the same shape. Empty views have the shape (0,).
+        """
+
+        length = count * size * calcsize(format)
+        end = self.pos + length
+
+        if self.arrays == ArrayMode.View and sys.byteorder == 'little' and end <= len(self.buffer):
+            view = memoryview(self.buffer)[self.pos:end]
+            self.pos = end
+            return view.cast(format, (count, size)) if count else view.cast(format)
+
+        data = self.read_items(length, size * calcsize(format))
+        return list(iter_unpack(f'<{size}{format}', data)) if data else []
+
+    def values(self, count: int, format: str = 'f') -> list | memoryview:
+        """
+        Reads `count` little endian numbers of a :mod:`struct` format as a flat list, or a memoryview of shape (count,)
+        in :attr:`ArrayMode.View`.
+        """
+
+        length = count * calcsize(format)
+        end = self.pos + length
+
+        if self.arrays == ArrayMode.View and sys.byteorder == 'little' and end <= len(self.buffer):
+            view = memoryview(self.buffer)[self.pos:end]
+            self.pos = end
+            return view.cast(format)
+
+        data = self.read_items(length, calcsize(format))
+        return list(unpack(f'<{len(data) // calcsize(format)}{format}', data))
+
+    def read_items(self, length: int, item: int) -> bytes:
+        """
+        Reads `length` bytes of items of `item` bytes. If the buffer ends before, the truncated data is reported and
+        only the complete items are read.
+        """
+
+        end = self.pos + length
+
+        if length and end > len(self.buffer):
+            ENV.Diag.report(SwbfBinaryParser.TruncatedData(self, length))
+            end = self.pos + max(0, len(self.buffer) - self.pos) // item * item
+
+        data = bytes(self.buffer[self.pos:end])
+        self.pos = end
+        return data
 
     def parse_format(self):
         raise NotImplementedError('This is an abstract base class!')
@@ -44,7 +44,7 @@ class Block(LexicalNode):
         self.type: str = ''
 
         if self.header not in ReqParser.Header:
-            ENV.Diag.report(ReqWarning(f'Block header "{self.header}" is not known.'))
+            ENV.Diag.report(ReqWarning('Block header "{}" is not known.', self.header))
 
 
 class Type(LexicalNode):
@@ -55,7 +55,7 @@ class Type(LexicalNode):
         self.type: str = self.raw().strip()
 
         if self.type not in ReqParser.Type:
-            ENV.Diag.report(ReqWarning(f'Block type "{self.type}" is not known.'))
+            ENV.Diag.report(ReqWarning('Block type "{}" is not known.', self.type))
 
 
 class Property(LexicalNode):
@@ -70,7 +70,7 @@ class Property(LexicalNode):
         self.value: str = match.group(2)
 
         if self.key not in ReqParser.Property:
-            ENV.Diag.report(ReqWarning(f'Block property "{self.key}" is not known.'))
+            ENV.Diag.report(ReqWarning('Block property "{}" is not known.', self.key))
 
 
 class Value(LexicalNode):
@@ -6,7 +6,7 @@ from parxel.token import TK, Token
 
 from app.environment import MungeEnvironment as ENV
 from swbf.parsers.parser import Ext, SwbfTextParser
-from swbf.parsers.cfg import CfgParser
+from swbf.parsers.cfg import CfgParser, UnknownCallMessage
 from util.diagnostic import WarningMessage
 from util.enumeration import Enum
 from util.logging import get_logger
@@ -17,6 +17,9 @@ class SkyWarning(WarningMessage):
 
 class SkyParser(CfgParser):
     Extension = Ext.Sky
+    class UnknownCall(UnknownCallMessage, SkyWarning):
+        def vocabulary(self) -> type[Enum]:
+            return SkyParser.Call
 
     class Call(Enum):
         Ambient = 'Ambient'
@@ -1,4 +1,10 @@
+import json
+import marshal
+from contextlib import contextmanager
 from math import log10
+from pathlib import Path
+from sys import modules
+from threading import Lock, local
 
 from util.enumeration import Enum
 from util.logging import get_logger, Ansi, ScopedLogger
@@ -23,11 +29,15 @@ class DiagnosticMessageMeta(type):
 
     Codes = {Severity.Error: 0, Severity.Warning: 0, Severity.Info: 0}
     Names = []
+    CodeDigits = 0  # Width of the codes of all messages
+    NameLength = 0  # Width of the names of all messages
 
     def __new__(cls, name, bases, dct):
         severity = dct.get('SEVERITY', Severity.Error)
         DiagnosticMessageMeta.Codes[severity] += 1
         DiagnosticMessageMeta.Names.append(name)
+        DiagnosticMessageMeta.CodeDigits = round(log10(max(0.1, max(DiagnosticMessageMeta.Codes.values()))))
+        DiagnosticMessageMeta.NameLength = max(DiagnosticMessageMeta.NameLength, len(name))
         dct['CODE'] = DiagnosticMessageMeta.Codes[severity]
         dct['NAME'] = name
 
@@ -40,6 +50,9 @@ class DiagnosticMessage(metaclass=DiagnosticMessageMeta):
     The :attr:`TOPIC` determines the module or topic in which the issue occurred.
     The :attr:`SCOPE` should be set during the definition of the diagnostic message
     and contain a 3 character wide unique identifier.
+
+    A message only keeps its text as a template with the arguments, the file and the position
+    it was reported at. The text is formatted when the message is rendered (see :meth:`format`).
     """
 
     TOPIC = ''
@@ -47,19 +60,100 @@ class DiagnosticMessage(metaclass=DiagnosticMessageMeta):
     CODE = 0
     NAME = ''
 
-    def __init__(self, text: str | None = None):
-        self.text: str | None = text
+    def __init__(self, text: str | None = None, *args, position: tuple[int, int] | None = None):
+        self.template: str | None = text
+        self.args: tuple = args
+        self.file: Path | None = None
+        self.position: tuple[int, int] | None = position
+
+    @classmethod
+    def restore(cls, text: str | None, args: tuple = (), position: tuple[int, int] | None = None):
+        """
+        Creates a message from its recorded template and arguments without calling the constructor again.
+        """
+
+        message = cls.__new__(cls)
+        DiagnosticMessage.__init__(message, text, *args, position=position)
+        return message
+
+    @property
+    def text(self) -> str | None:
+        return self.format()
+
+    def format(self) -> str | None:
+        """
+        Returns the text of the message. The template is formatted with :meth:`str.format` if arguments are given.
+        """
+
+        if self.args:
+            return self.template.format(*self.args)
+        return self.template
+
+    @classmethod
+    def triplet(cls, code_digits: int = 0) -> str:
+        topic = cls.TOPIC or cls.NAME[:3].upper()
+        return f'{topic}-{cls.SEVERITY}-{cls.CODE:0{code_digits}}'
+
+    def encode(self) -> tuple:
+        """
+        Returns the type, template, arguments and position of the message as values supported by :mod:`marshal`.
+        Paths are passed as strings, the message is formatted if other arguments are not supported.
+        """
+
+        message_type = (type(self).__module__, type(self).__qualname__)
+        args = tuple(str(arg) if isinstance(arg, Path) else arg for arg in self.args)
+
+        try:
+            marshal.dumps(args)
+        except ValueError:
+            return message_type, self.text, (), self.position
+
+        return message_type, self.template, args, self.position
+
+    @staticmethod
+    def decode(entry: tuple) -> 'DiagnosticMessage':
+        (module, name), template, args, position = entry
+        message_type = modules[module]
+
+        for part in name.split('.'):
+            message_type = getattr(message_type, part)
+
+        return message_type.restore(template, args, position)
+
+    def identity(self) -> tuple:
+        """
+        Returns what makes messages identical, the same issue reported for different files has the same identity.
+        """
+
+        try:
+            hash(self.args)
+            return type(self), self.template, self.args
+
+        except TypeError:
+            return type(self), self.text, ()
+
+    def record(self) -> dict:
+        """
+        Returns the message as a plain record for machine readable exports.
+        """
+
+        # yapf: disable
+        return {
+            'code': self.triplet(),
+            'name': self.NAME,
+            'severity': self.SEVERITY,
+            'file': str(self.file) if self.file else None,
+            'position': list(self.position) if self.position else None,
+            'text': self.text,
+        }
+        # yapf: enable
 
     def __str__(self):
-        code_digits = round(log10(max(0.1, max(DiagnosticMessageMeta.Codes.values()))))
-        name_length = len(max(DiagnosticMessageMeta.Names, key=lambda x: len(x)))
-        code = self.__class__.CODE
         name = self.__class__.NAME
         severity = self.__class__.SEVERITY
-        topic = self.__class__.TOPIC or name[:3].upper()
-        triplet = f'{topic}-{severity}-{code:0{code_digits}}'
+        triplet = self.triplet(DiagnosticMessageMeta.CodeDigits)
 
-        message = f'[{triplet}] {name:{name_length}}: {self.text}'
+        message = f'[{triplet}] {name:{DiagnosticMessageMeta.NameLength}}: {self.text}'
         if severity == Severity.Info:
             return Ansi.color_fg(Ansi.CyanForeground, message)
         elif severity == Severity.Warning:
@@ -83,35 +177,158 @@ class InfoMessage(DiagnosticMessage):
 class Diagnostic:
     """
     The :class:`Diagnostic` class is used to record diagnostic messages and report them to the user.
+
+    Only the first :attr:`limit` messages of a code are logged, further messages are counted and listed
+    in the :meth:`summary`. All messages are kept for :meth:`details` and :meth:`export`.
     """
 
-    def __init__(self, logger: ScopedLogger = get_logger(__name__)):
+    Captured = local()  # Messages and file of the current thread inside of `capture` and `scope`
+    LIMIT = 10  # Logged messages per code
+
+    def __init__(self, logger: ScopedLogger = get_logger(__name__), limit: int = LIMIT):
         self.logger: ScopedLogger = logger
+        self.limit: int = limit  # Negative limits log all messages
         self.messages: list[DiagnosticMessage] = []
+        self.codes: dict[type, int] = {}  # Reported messages per code
         self.severeties: dict = {}
+        self.lock: Lock = Lock()  # Messages are reported by the munge threads
 
         for severity in Severity:
             self.severeties[severity] = 0
 
+    def __getstate__(self) -> dict:
+        # The diagnostic is stored in the cache file of the environment without its lock
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
     def report(self, message: DiagnosticMessage):
-        self.messages.append(message)
-        self.severeties[message.SEVERITY] += 1
+        if message.file is None:
+            message.file = getattr(Diagnostic.Captured, 'file', None)
+
+        captured = getattr(Diagnostic.Captured, 'messages', None)
+        if captured is not None:
+            captured.append(message)
+
+        with self.lock:
+            self.messages.append(message)
+            self.severeties[message.SEVERITY] += 1
+
+            count = self.codes.get(type(message), 0) + 1
+            self.codes[type(message)] = count
 
-        if message.SEVERITY == Severity.Error:
-            self.logger.error(str(message))
-        elif message.SEVERITY == Severity.Warning:
-            self.logger.warning(str(message))
-        elif message.SEVERITY == Severity.Info:
-            self.logger.info(str(message))
+        if self.limit < 0 or count <= self.limit:
+            # The message is only formatted if the record is emitted
+            self.log(message.SEVERITY, '%s', message)
+        elif count == self.limit + 1:
+            self.log(message.SEVERITY, 'Further "%s" messages are counted in the summary', message.NAME)
+
+    def log(self, severity: Severity, text: str, *args):
+        if severity == Severity.Error:
+            self.logger.error(text, *args)
+        elif severity == Severity.Warning:
+            self.logger.warning(text, *args)
+        elif severity == Severity.Info:
+            self.logger.info(text, *args)
+
+    @contextmanager
+    def capture(self):
+        """
+        Collects the messages which the current thread reports inside of the context.
+        """
+
+        previous = getattr(Diagnostic.Captured, 'messages', None)
+        messages = []
+        Diagnostic.Captured.messages = messages
+
+        try:
+            yield messages
+
+        finally:
+            Diagnostic.Captured.messages = previous
+
+            # Enclosing captures receive the messages as well
+            if previous is not None:
+                previous.extend(messages)
+
+    def captured(self) -> list[DiagnosticMessage]:
+        """
+        Returns the messages of the innermost capture of the current thread.
+        """
+
+        return getattr(Diagnostic.Captured, 'messages', None) or []
+
+    @contextmanager
+    def scope(self, file: Path):
+        """
+        Assigns the file to the messages which the current thread reports inside of the context.
+        """
+
+        previous = getattr(Diagnostic.Captured, 'file', None)
+        Diagnostic.Captured.file = file
+
+        try:
+            yield
+
+        finally:
+            Diagnostic.Captured.file = previous
+
+    @staticmethod
+    def dumps(messages: list[DiagnosticMessage]) -> bytes:
+        return marshal.dumps([message.encode() for message in messages])
+
+    @staticmethod
+    def loads(data: bytes) -> list[DiagnosticMessage]:
+        return [DiagnosticMessage.decode(entry) for entry in marshal.loads(data)]
+
+    def export(self, filepath: Path):
+        """
+        Writes the records of all messages as JSON lines.
+        """
+
+        with filepath.open('w', encoding='utf-8') as stream:
+            for message in self.messages:
+                stream.write(json.dumps(message.record()) + '\n')
+
+    def groups(self) -> dict[tuple, list[DiagnosticMessage]]:
+        """
+        Groups identical messages in the order they were first reported.
+        """
+
+        groups = {}
+
+        for message in self.messages:
+            groups.setdefault(message.identity(), []).append(message)
+
+        return groups
+
+    def clear(self):
+        with self.lock:
+            self.messages.clear()
+            self.codes.clear()
+
+            for severity in Severity:
+                self.severeties[severity] = 0
 
     def details(self):
         print(Ansi.color_fg(Ansi.GreenForeground, '\nDiagnostic Details: \n'))
-        for m in self.messages:
-            print(m)
+        for messages in self.groups().values():
+            files = len({m.file for m in messages})
+            count = f' ({len(messages)} times in {files} files)' if len(messages) > 1 else ''
+            print(f'{messages[0]}{count}')
 
     def summary(self):
         s = Ansi.color_fg(Ansi.GreenForeground, '\nDiagnostic Summary: \n')
         s += Ansi.color_fg(Ansi.RedForeground, f'{self.severeties[Severity.Error]:3d}' + ' Errors \n')
         s += Ansi.color_fg(Ansi.YellowForeground, f'{self.severeties[Severity.Warning]:3d}' + ' Warnings \n')
         s += Ansi.color_fg(Ansi.CyanForeground, f'{self.severeties[Severity.Info]:3d}' + ' Infos \n')
+
+        for code, count in self.codes.items():
+            if 0 <= self.limit < count:
+                s += f'{count:3d} {code.NAME} ({count - self.limit} not logged) \n'
+
         print(s)
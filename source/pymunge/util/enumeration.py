@@ -42,16 +42,62 @@ class EnumMeta(type):
 
         cls = super().__new__(mcls, name, bases, namespace)
         cls.enumerators = list(enumerators.items())
+
+        # Indexes, values are looked up for every parsed node
+        cls._values = tuple(enumerators.values())
+        cls._members = dict(enumerators)  # Enumerator name -> value
+        cls._keys = {}  # Value -> first enumerator name
+        cls._folded = {}  # Case folded value -> first value
+
+        for key, value in reversed(cls.enumerators):
+            try:
+                cls._keys[value] = key
+            except TypeError:
+                continue  # Unhashable values (e.g. lookup tables) are only found by iteration
+
+            if isinstance(value, str):
+                cls._folded[value.casefold()] = value
+
         return cls
 
+    def __contains__(cls, value) -> bool:
+        try:
+            return value in cls._keys
+        except TypeError:
+            return value in cls._values
+
     def __iter__(cls):
-        return iter(cls.vals())
+        return iter(cls._values)
 
     def keys(cls):
         return [k for k, _ in cls.enumerators]
 
     def vals(cls):
-        return [v for _, v in cls.enumerators]
+        return list(cls._values)
+
+    def member(cls, name: str):
+        """
+        Returns the value of the enumerator with the given name.
+        """
+
+        return cls._members.get(name)
+
+    def key(cls, value) -> str | None:
+        """
+        Returns the name of the enumerator with the given value.
+        """
+
+        try:
+            return cls._keys.get(value)
+        except TypeError:
+            return None
+
+    def casefold(cls, value: str) -> str | None:
+        """
+        Returns the value which equals the given value ignoring the case.
+        """
+
+        return cls._folded.get(value.casefold())
 
 
 class Enum(metaclass=EnumMeta):
@@ -1,7 +1,13 @@
+import atexit
 import logging
+import os
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from os import getcwd
+from os.path import abspath
 from pathlib import Path
+from queue import SimpleQueue
+from threading import Event, Lock
 from util.enumeration import Enum
 
 
@@ -124,40 +130,144 @@ class ColorFormatter(logging.Formatter):
         super().__init__(format, *args, **kwargs)
         self.format_string = format
         self.datefmt = datefmt
+        self.formatters: dict[str, logging.Formatter] = {}  # Formatters by level name
+
+        for level, style in ColorFormatter.LevelStyle.items():
+            prefix = Ansi.Escape.format(';'.join(map(str, style)))
+            suffix = Ansi.Escape.format(Ansi.Reset)
+            self.formatters[level] = logging.Formatter(prefix + self.format_string + suffix, datefmt=self.datefmt)
 
     def format(self, record):
-        style = ';'.join(list(map(str, ColorFormatter.LevelStyle[record.levelname.lower()])))
-        prefix = Ansi.Escape.format(style)
-        suffix = Ansi.Escape.format(Ansi.Reset)
-        log_format = prefix + self.format_string + suffix
-        formatter = logging.Formatter(log_format, datefmt=self.datefmt)
-        return formatter.format(record)
+        return self.formatters[record.levelname.lower()].format(record)
 
 
-def get_logger(name: str, filepath: Path = Path(), filename: str = None, level: str = LogLevel.Info, ansi_style: bool = False):
-    logger = logging.getLogger(name)
+class LogPipeline:
+    """
+    The :class:`LogPipeline` puts the records of all loggers into a single queue. A listener thread passes
+    them on to the handlers of their logger, so logging threads neither format records nor wait for the
+    locks of the handlers. A forked process has no listener thread and emits its records directly.
+    """
 
-    datefmt='%Y-%m-%d %H:%M:%S'
+    Queue: SimpleQueue = SimpleQueue()
+    Handlers: dict[str, list[logging.Handler]] = {}  # Handlers by logger name
+    Listener: QueueListener = None
+    Forked: bool = False
+    Lock: Lock = Lock()
 
-    # Stream handler
-    # yapf: disable
-    stream_format = str(
-        '[%(asctime)s.%(msecs)03d]'
-        '[%(levelname)-8s]'
-        '[%(name)-8s]'
-        '[%(filename)s:%(lineno)-d] '
-        '%(message)s'
-    )
-    # yapf: enable
+    class Router(logging.Handler):
+
+        def handle(self, record: logging.LogRecord):
+            LogPipeline.route(record)
+
+    @staticmethod
+    def start():
+        with LogPipeline.Lock:
+            if LogPipeline.Listener or LogPipeline.Forked:
+                return
+
+            LogPipeline.Listener = QueueListener(LogPipeline.Queue, LogPipeline.Router())
+            LogPipeline.Listener.start()
+            atexit.register(LogPipeline.stop)
+
+    @staticmethod
+    def stop():
+        """
+        Emits the remaining records and stops the listener thread. Later records are emitted directly.
+        """
+
+        listener = LogPipeline.Listener
+        LogPipeline.Listener = None
+
+        if listener:
+            listener.stop()
+
+    @staticmethod
+    def flush(timeout: float | None = None):
+        """
+        Waits until the records which were logged before are emitted.
+        """
+
+        if LogPipeline.Listener is None:
+            return
 
-    stream_handler = logging.StreamHandler(sys.stdout)
+        flushed = Event()
+        LogPipeline.Queue.put(logging.makeLogRecord({'flushed': flushed}))
+        flushed.wait(timeout)
 
+    @staticmethod
+    def route(record: logging.LogRecord):
+        flushed = getattr(record, 'flushed', None)
+
+        if flushed:
+            flushed.set()
+            return
+
+        for handler in LogPipeline.Handlers.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    @staticmethod
+    def forked():
+        LogPipeline.Listener = None
+        LogPipeline.Forked = True
+
+
+# Processes are only forked on Unix, spawned processes import the module again
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=LogPipeline.forked)
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Puts records into the :class:`LogPipeline` as they are. They are formatted by the handlers in the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if LogPipeline.Listener is None:
+            LogPipeline.route(record)
+        else:
+            self.enqueue(record)
+
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# yapf: disable
+STREAM_FORMAT = str(
+    '[%(asctime)s.%(msecs)03d]'
+    '[%(levelname)-8s]'
+    '[%(name)-8s]'
+    '[%(filename)s:%(lineno)-d] '
+    '%(message)s'
+)
+# yapf: enable
+
+
+def get_formatter(ansi_style: bool = False) -> logging.Formatter:
     if ansi_style:
-        stream_handler.setFormatter(ColorFormatter(stream_format, datefmt=datefmt))
-    else:
-        stream_handler.setFormatter(logging.Formatter(stream_format, datefmt=datefmt))
+        return ColorFormatter(STREAM_FORMAT, datefmt=DATE_FORMAT)
+    return logging.Formatter(STREAM_FORMAT, datefmt=DATE_FORMAT)
 
-    logger.addHandler(stream_handler)
+
+def get_logger(name: str, filepath: Path = Path(), filename: str = None, level: str = LogLevel.Info, ansi_style: bool = False):
+    """
+    Returns a logger whose records are emitted by the :class:`LogPipeline`. Repeated calls for the same name
+    reuse the handlers of the first call and only add a file handler for another file.
+    """
+
+    logger = logging.getLogger(name)
+    handlers = list(LogPipeline.Handlers.get(name, []))
+
+    datefmt = DATE_FORMAT
+
+    # Stream handler
+    stream_handler = next((handler for handler in handlers if type(handler) is logging.StreamHandler), None)
+    if stream_handler is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        handlers.append(stream_handler)
+    stream_handler.setFormatter(get_formatter(ansi_style))
 
     # File handler
     if (filepath and filepath.name) or filename:
@@ -172,11 +282,19 @@ def get_logger(name: str, filepath: Path = Path(), filename: str = None, level:
         # yapf: enable
 
         filename = name + '.log' if not filename else filename
-        filepath = getcwd() if not filepath.name else filepath
-        file_handler = logging.FileHandler(filepath / filename)
-        file_handler.setFormatter(logging.Formatter(file_format, datefmt=datefmt))
-        logger.addHandler(file_handler)
+        filepath = Path(getcwd()) if not filepath.name else filepath
+
+        if not any(getattr(handler, 'baseFilename', None) == abspath(filepath / filename) for handler in handlers):
+            file_handler = logging.FileHandler(filepath / filename)
+            file_handler.setFormatter(logging.Formatter(file_format, datefmt=datefmt))
+            handlers.append(file_handler)
+
+    LogPipeline.Handlers[name] = handlers
+
+    if not any(isinstance(handler, LogQueueHandler) for handler in logger.handlers):
+        logger.addHandler(LogQueueHandler(LogPipeline.Queue))
 
     logger.setLevel(level.upper())
+    LogPipeline.start()
 
     return ScopedLogger(logger)
@@ -0,0 +1,93 @@
+from threading import RLock
+
+
+class ShardedDict:
+    """
+    Dictionary which is split into shards by the hash of the key. Every shard is guarded by its own lock,
+    so threads working on different keys rarely wait for each other. Iterating returns a snapshot, which
+    stays valid while other threads keep inserting.
+    """
+
+    def __init__(self, shards: int = 16):
+        count = 1 << max(0, shards - 1).bit_length()  # Round up to a power of two
+
+        self.mask: int = count - 1
+        self.maps: list[dict] = [{} for _ in range(count)]
+        self.locks: list[RLock] = [RLock() for _ in range(count)]
+
+    def shard(self, key) -> int:
+        return hash(key) & self.mask
+
+    def lock(self, key) -> RLock:
+        """
+        Returns the lock of the shard of a key. Holding it makes compound operations on the key atomic.
+        """
+
+        return self.locks[self.shard(key)]
+
+    def __contains__(self, key) -> bool:
+        return key in self.maps[self.shard(key)]
+
+    def __getitem__(self, key):
+        return self.maps[self.shard(key)][key]
+
+    def __setitem__(self, key, value):
+        index = self.shard(key)
+        with self.locks[index]:
+            self.maps[index][key] = value
+
+    def __delitem__(self, key):
+        index = self.shard(key)
+        with self.locks[index]:
+            del self.maps[index][key]
+
+    def __len__(self) -> int:
+        return sum(map(len, self.maps))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        return self.maps[self.shard(key)].get(key, default)
+
+    def pop(self, key, *default):
+        index = self.shard(key)
+        with self.locks[index]:
+            return self.maps[index].pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        index = self.shard(key)
+        with self.locks[index]:
+            return self.maps[index].setdefault(key, default)
+
+    def get_or_create(self, key, factory: callable) -> tuple[object, bool]:
+        """
+        Returns the value of a key and whether it was created by calling `factory` with the key.
+        """
+
+        index = self.shard(key)
+        with self.locks[index]:
+            if key in self.maps[index]:
+                return self.maps[index][key], False
+
+            value = factory(key)
+            self.maps[index][key] = value
+            return value, True
+
+    def keys(self) -> list:
+        return [key for key, _ in self.items()]
+
+    def values(self) -> list:
+        return [value for _, value in self.items()]
+
+    def items(self) -> list[tuple]:
+        items = []
+        for index, shard in enumerate(self.maps):
+            with self.locks[index]:
+                items.extend(shard.items())
+        return items
+
+    def clear(self):
+        for index, shard in enumerate(self.maps):
+            with self.locks[index]:
+                shard.clear()
@@ -14,13 +14,33 @@ class Statistic:
 
     def record(self, tag: str, name: str, f: callable, *args, **kwargs):
         time, result = measure(f, *args, **kwargs)
+        self.add(tag, name, time)
+
+        return result
+
+    def add(self, tag: str, name: str, time: int):
+        """
+        Adds a time which was measured by the caller, e.g. only if the measured call had an effect.
+        """
 
         if tag not in self.times:
             self.times[tag] = {}
 
         self.times[tag][name] = time
 
-        return result
+    def merge(self, times: dict):
+        """
+        Adds the recorded times of another :class:`Statistic` (e.g. from a worker process).
+        """
+
+        for tag, names in times.items():
+            if tag not in self.times:
+                self.times[tag] = {}
+
+            self.times[tag].update(names)
+
+    def clear(self):
+        self.times.clear()
 
     def details(self):
         for tag, times in self.times.items():
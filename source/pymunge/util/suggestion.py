@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from threading import Lock
+from typing import Iterable
+
+from util.enumeration import EnumMeta
+
+
+class SuggestionIndex:
+    """
+    The :class:`SuggestionIndex` finds the entries of a vocabulary which are similar to an unknown word.
+    Entries are compared ignoring the case by the ratio of :class:`SequenceMatcher`, the best `n` entries
+    with a ratio of at least `cutoff` are suggested.
+
+    The entries are sorted by length, as the ratio can only reach the cutoff for entries of a similar length.
+    The remaining candidates are filtered by the cheap upper bounds of the ratio before the ratio is computed.
+    Every entry keeps its own matcher, so the entry is indexed only once. Results are memoized per word,
+    the same misspelling is usually found in many files.
+    """
+
+    Indexes: dict = {}  # Indexes by vocabulary
+    MEMO_SIZE = 4096
+
+    def __init__(self, vocabulary: Iterable[str], n: int = 3, cutoff: float = 0.8):
+        self.n: int = n
+        self.cutoff: float = cutoff
+
+        entries = sorted((len(entry.lower()), entry) for entry in vocabulary)
+
+        self.lengths: list[int] = [length for length, _ in entries]
+        self.matchers: list[tuple[str, SequenceMatcher]] = [
+            (entry, SequenceMatcher(None, '', entry.lower())) for _, entry in entries
+        ]
+        self.memo: dict[str, list[str]] = {}
+        self.lock: Lock = Lock()  # Matchers are reused between threads
+
+    @staticmethod
+    def of(vocabulary: Iterable[str]) -> 'SuggestionIndex':
+        """
+        Returns the shared index of a vocabulary (e.g. an :class:`Enum`).
+        """
+
+        try:
+            index = SuggestionIndex.Indexes.get(vocabulary)
+        except TypeError:
+            return SuggestionIndex(vocabulary)
+
+        if index is None:
+            index = SuggestionIndex.Indexes.setdefault(vocabulary, SuggestionIndex(vocabulary))
+
+        return index
+
+    def matches(self, word: str) -> list[str]:
+        word = word.lower()
+        matches = self.memo.get(word)
+
+        if matches is not None:
+            return matches
+
+        # 2 * min(a, b) / (a + b) >= cutoff
+        length = len(word)
+        shortest = bisect_left(self.lengths, int(length * self.cutoff / (2 - self.cutoff)))
+        longest = bisect_right(self.lengths, int(length * (2 - self.cutoff) / self.cutoff) + 1)
+        scored = []
+
+        with self.lock:
+            for entry, matcher in self.matchers[shortest:longest]:
+                matcher.set_seq1(word)
+
+                if matcher.real_quick_ratio() < self.cutoff or matcher.quick_ratio() < self.cutoff:
+                    continue
+
+                ratio = matcher.ratio()
+                if ratio >= self.cutoff:
+                    scored.append((-ratio, entry))
+
+        scored.sort()
+        matches = [entry for _, entry in scored[:self.n]]
+
+        if len(self.memo) >= SuggestionIndex.MEMO_SIZE:
+            self.memo.clear()
+        self.memo[word] = matches
+
+        return matches
+
+
+def suggest_option(needle: str, haystack: Iterable[str]) -> str:
+    # A name which only differs in case is what was meant, the case insensitive index finds it without matching
+    folded = haystack.casefold(needle) if isinstance(haystack, EnumMeta) else None
+    matches = [folded] if folded is not None else SuggestionIndex.of(haystack).matches(needle)
+    if not matches:
+        return ''
+    filler = '' if len(matches) == 1 else 'one of '
+    suggestions = ', '.join(f'"{option}"' for option in matches)
+    return f'Did you mean {filler}{suggestions}?'
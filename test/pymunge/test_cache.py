@@ -0,0 +1,68 @@
+from os import utime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.app.cache import BuildCache, content_digest
+
+
+class BuildCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.source = self.path / 'unit.odf'
+        self.source.write_bytes(b'[GameObjectClass]')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip(self):
+        cache = BuildCache(self.path / 'cache', salt='pc')
+        key = cache.key(self.source)
+
+        self.assertIsNone(cache.load(key, 'class'))
+        cache.store(key, 'class', b'data')
+        self.assertEqual(cache.load(key, 'class'), b'data')
+
+    def test_key(self):
+        pc = BuildCache(self.path / 'cache', salt='pc')
+        ps2 = BuildCache(self.path / 'cache', salt='ps2')
+        key = pc.key(self.source)
+
+        self.assertNotEqual(key, ps2.key(self.source))
+
+        self.source.write_bytes(b'[ExplosionClass]')
+        self.assertNotEqual(key, pc.key(self.source))
+
+    def test_shared(self):
+        shared = BuildCache(self.path / 'shared', salt='pc')
+        first = BuildCache(self.path / 'first', salt='pc', shared=shared)
+        second = BuildCache(self.path / 'second', salt='pc', shared=shared)
+        key = first.key(self.source)
+
+        first.store(key, 'class', b'data')
+
+        self.assertEqual(second.load(key, 'class'), b'data')
+        self.assertTrue(second.entry(key, 'class').exists())
+
+    def test_evict(self):
+        cache = BuildCache(self.path / 'cache', size=8)
+
+        for i, key in enumerate(['aa', 'bb', 'cc']):
+            cache.store(key, 'class', b'data')
+            utime(cache.entry(key, 'class'), (i, i))
+
+        cache.load('aa', 'class')
+        cache.evict()
+
+        self.assertTrue(cache.entry('aa', 'class').exists())
+        self.assertFalse(cache.entry('bb', 'class').exists())
+        self.assertTrue(cache.entry('cc', 'class').exists())
+        self.assertFalse((cache.directory / BuildCache.LOCK).exists())
+
+    def test_digest(self):
+        cache = BuildCache(self.path / 'cache', salt='pc')
+
+        # A digest computed once gives the same key as hashing the file again
+        self.assertEqual(cache.key(self.source, content_digest(self.source)), cache.key(self.source))
@@ -0,0 +1,110 @@
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.util.diagnostic import Diagnostic, WarningMessage
+from source.pymunge.util.logging import LogLevel, get_logger
+
+
+class UnitWarning(WarningMessage):
+    TOPIC = 'UNT'
+    Formatted = 0
+
+    def __init__(self, key: str, position: tuple[int, int] | None = None):
+        super().__init__('Key "{}" is not known', key, position=position)
+
+    def format(self) -> str:
+        UnitWarning.Formatted += 1
+        return super().format()
+
+
+class DiagnosticTest(TestCase):
+
+    def setUp(self):
+        UnitWarning.Formatted = 0
+        self.diagnostic = Diagnostic(logger=get_logger('diagnostic-test', level=LogLevel.Error))
+
+    def test_deferred(self):
+        for _ in range(100):
+            self.diagnostic.report(UnitWarning('Scale'))
+
+        self.assertEqual(UnitWarning.Formatted, 0)
+        self.assertEqual(self.diagnostic.messages[0].text, 'Key "Scale" is not known')
+        self.assertEqual(UnitWarning.Formatted, 1)
+
+    def test_scope(self):
+        file = Path('unit.odf')
+
+        with self.diagnostic.scope(file):
+            self.diagnostic.report(UnitWarning('Scale', (3, 4)))
+        self.diagnostic.report(UnitWarning('Label'))
+
+        self.assertEqual(self.diagnostic.messages[0].file, file)
+        self.assertIsNone(self.diagnostic.messages[1].file)
+
+    def test_export(self):
+        with self.diagnostic.scope(Path('unit.odf')):
+            self.diagnostic.report(UnitWarning('Scale', (3, 4)))
+
+        with TemporaryDirectory() as directory:
+            filepath = Path(directory) / 'diagnostics.jsonl'
+            self.diagnostic.export(filepath)
+            records = [json.loads(line) for line in filepath.read_text().splitlines()]
+
+        # yapf: disable
+        self.assertEqual(records, [{
+            'code': f'UNT-W-{UnitWarning.CODE}',
+            'name': 'UnitWarning',
+            'severity': 'W',
+            'file': 'unit.odf',
+            'position': [3, 4],
+            'text': 'Key "Scale" is not known',
+        }])
+        # yapf: enable
+
+    def test_restore(self):
+        message = UnitWarning.restore('Key "{}" is not known', ('Scale', ), (3, 4))
+
+        self.assertEqual(message.text, 'Key "Scale" is not known')
+        self.assertEqual(message.position, (3, 4))
+
+    def test_limit(self):
+        diagnostic = Diagnostic(logger=self.diagnostic.logger, limit=2)
+
+        with self.assertLogs(diagnostic.logger.logger, level=LogLevel.Warning.upper()) as logs:
+            for key in ('Scale', 'Label', 'Scale', 'Scale', 'Label'):
+                diagnostic.report(UnitWarning(key))
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(len(diagnostic.messages), 5)
+        self.assertEqual(diagnostic.codes[UnitWarning], 5)
+
+    def test_threads(self):
+        def report(key: str):
+            for _ in range(1000):
+                self.diagnostic.report(UnitWarning(key))
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(report, [str(i) for i in range(8)]))
+
+        self.assertEqual(len(self.diagnostic.messages), 8000)
+        self.assertEqual(self.diagnostic.codes[UnitWarning], 8000)
+        self.assertEqual(self.diagnostic.severeties[UnitWarning.SEVERITY], 8000)
+
+        restored = pickle.loads(pickle.dumps(self.diagnostic))
+        restored.report(UnitWarning('Scale'))
+        self.assertEqual(restored.codes[UnitWarning], 8001)
+
+    def test_groups(self):
+        for file in ('a.odf', 'b.odf', 'c.odf'):
+            with self.diagnostic.scope(Path(file)):
+                self.diagnostic.report(UnitWarning('Scale'))
+        self.diagnostic.report(UnitWarning('Label'))
+
+        groups = list(self.diagnostic.groups().values())
+
+        self.assertEqual([len(messages) for messages in groups], [3, 1])
+        self.assertEqual(UnitWarning.Formatted, 0)
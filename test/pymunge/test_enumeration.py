@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from source.pymunge.util.enumeration import Enum
+
+
+class Section(Enum):
+    Properties = 'Properties'
+    GameObjectClass = 'GameObjectClass'
+    GameObjectclass = 'GameObjectclass'
+    Default = 'Properties'
+
+
+class Tool(Enum):
+    Odf = 'odf'
+    _FILTER = {Odf: ['odf']}
+
+
+class EnumerationTest(TestCase):
+
+    def test_contains(self):
+        self.assertIn('Properties', Section)
+        self.assertNotIn('properties', Section)
+        self.assertNotIn(['Properties'], Section)
+
+        self.assertIn('odf', Tool)
+        self.assertIn({'odf': ['odf']}, Tool)
+
+    def test_vals(self):
+        self.assertEqual(list(Section), ['Properties', 'GameObjectClass', 'GameObjectclass', 'Properties'])
+        self.assertEqual(Section.vals(), list(Section))
+
+    def test_indexes(self):
+        self.assertEqual(Section.member('Default'), 'Properties')
+        self.assertIsNone(Section.member('Unknown'))
+
+        self.assertEqual(Section.key('Properties'), 'Properties')
+        self.assertEqual(Section.key('GameObjectclass'), 'GameObjectclass')
+        self.assertIsNone(Section.key('Unknown'))
+        self.assertIsNone(Section.key(['Properties']))
+
+        self.assertEqual(Section.casefold('PROPERTIES'), 'Properties')
+        self.assertEqual(Section.casefold('gameobjectCLASS'), 'GameObjectClass')
+        self.assertIsNone(Section.casefold('Unknown'))
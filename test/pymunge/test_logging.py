@@ -0,0 +1,39 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.util.logging import LogLevel, LogPipeline, LogQueueHandler, get_logger
+
+
+class LoggingTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        for handler in LogPipeline.Handlers.pop('logging-test', []):
+            handler.close()
+        self.directory.cleanup()
+
+    def test_handlers(self):
+        logger = get_logger('logging-test', filepath=self.path, level=LogLevel.Debug)
+        logger = get_logger('logging-test', filepath=self.path, level=LogLevel.Debug)
+
+        queue_handlers = [handler for handler in logger.logger.handlers if isinstance(handler, LogQueueHandler)]
+
+        self.assertEqual(len(queue_handlers), 1)
+        self.assertEqual(len(LogPipeline.Handlers['logging-test']), 2)
+
+    def test_flush(self):
+        logger = get_logger('logging-test', filepath=self.path, level=LogLevel.Info)
+
+        logger.debug('Register file: %s', 'unit.odf')
+        for i in range(5):
+            logger.info('Record %d', i)
+        LogPipeline.flush()
+
+        lines = (self.path / 'logging-test.log').read_text().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[-1].endswith('Record 4'))
@@ -0,0 +1,238 @@
+from pathlib import Path
+from struct import pack
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from source.pymunge.swbf.parsers.msh import Mesh, Model, ModelType, MshParser, Name, PositionVertices, ShadowMesh
+from source.pymunge.swbf.parsers.msh import Polygons, Skeleton, Strip, TransformModel, Triangles, WeightBones
+from source.pymunge.swbf.parsers.parser import ENV, ArrayMode, ChunkMode, InputMode
+from source.pymunge.util.diagnostic import Diagnostic
+
+
+def chunk(name: str, data: bytes) -> bytes:
+    return name.encode() + pack('<I', len(data)) + data
+
+
+class MshArrayTest(TestCase):
+    POSITIONS = [(0.0, 1.0, 2.0), (3.0, 4.5, -5.0)]
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'unit.msh'
+
+        ENV.Diag = Diagnostic()
+
+    def tearDown(self):
+        ENV.reset()
+        self.directory.cleanup()
+
+    def parser(self, data: bytes, arrays: str) -> MshParser:
+        self.path.write_bytes(data)
+        return MshParser(self.path, arrays=arrays)
+
+    def test_positions(self):
+        floats = [x for position in MshArrayTest.POSITIONS for x in position]
+        data = chunk('POSL', pack('<I6f', 2, *floats))
+
+        listed = PositionVertices(self.parser(data, ArrayMode.List))
+        viewed = PositionVertices(self.parser(data, ArrayMode.View))
+
+        self.assertEqual(listed.positions, MshArrayTest.POSITIONS)
+        self.assertEqual(viewed.positions.shape, (2, 3))
+        self.assertEqual(viewed.positions.tolist(), [list(p) for p in MshArrayTest.POSITIONS])
+
+    def test_weights(self):
+        data = chunk('WGHT', pack('<I', 1) + b''.join(pack('<If', bone, 0.25) for bone in range(4)))
+
+        listed = WeightBones(self.parser(data, ArrayMode.List))
+        viewed = WeightBones(self.parser(data, ArrayMode.View))
+
+        for weights in [listed, viewed]:
+            self.assertEqual(list(weights.bones), [0, 1, 2, 3])
+            self.assertEqual(list(weights.factors), [0.25] * 4)
+            self.assertEqual(weights.weights, [(bone, 0.25) for bone in range(4)])
+
+        self.assertIsInstance(viewed.bones, memoryview)
+
+    def test_empty(self):
+        data = chunk('SHDW', pack('<II', 0, 0))
+        shadow = ShadowMesh(self.parser(data, ArrayMode.View))
+
+        self.assertEqual(len(shadow.vertices), 0)
+        self.assertEqual(len(shadow.edges), 0)
+
+    def test_truncated(self):
+        data = chunk('POSL', pack('<I4f', 2, 0.0, 1.0, 2.0, 3.0))
+        positions = PositionVertices(self.parser(data, ArrayMode.View)).positions
+
+        # Only the complete rows are read and the truncated data is reported
+        self.assertEqual(positions, [(0.0, 1.0, 2.0)])
+        self.assertEqual(
+            [message.text for message in ENV.Diag.messages],
+            [f'Unexpected end of file {self.path} at offset 12: Expected 24 bytes, got 16']
+        )
+
+        # A truncated header ends the walk
+        ENV.Diag.clear()
+        self.path.write_bytes(chunk('HEDR', b'') + b'MS')
+        tree = MshParser(self.path).parse()
+
+        self.assertEqual([node.type() for node in tree.children], ['Header'])
+        self.assertEqual(len(ENV.Diag.messages), 1)
+
+
+class MshChunkIndexTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'unit.msh'
+
+        segment = chunk('SEGM', chunk('POSL', pack('<I3f', 1, 0.0, 1.0, 2.0)))
+        model = b''.join([
+            chunk('MTYP', pack('<I', 3)),
+            chunk('NAME', b'bone_root\0\0\0'),
+            chunk('TRAN', pack('<10f', 1, 1, 1, 0, 0, 0, 1, 4, 5, 6)),
+            chunk('GEOM', segment)
+        ])
+        mesh = chunk('MSH2', chunk('MODL', model))
+        self.path.write_bytes(chunk('HEDR', mesh))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def parse(self, chunks: str, input_mode: str = InputMode.Read) -> MshParser:
+        tree = MshParser(self.path, arrays=ArrayMode.List, chunks=chunks, input_mode=input_mode)
+        tree.parse()
+        return tree
+
+    def test_lazy(self):
+        tree = self.parse(ChunkMode.Index)
+        model = tree.find_nested(Model)
+        positions = tree.find_nested(PositionVertices)
+
+        self.assertIn('_chunk_index', vars(positions))
+        self.assertEqual(model.find(ModelType).model_type, 3)
+        self.assertEqual(model.find(Name).name, 'bone_root\0\0\0')
+        self.assertEqual(model.find(TransformModel).translation, (4.0, 5.0, 6.0))
+        self.assertIn('_chunk_index', vars(positions))
+
+        self.assertEqual(positions.positions, [(0.0, 1.0, 2.0)])
+        self.assertNotIn('_chunk_index', vars(positions))
+        self.assertFalse(tree.cacheable())
+
+    def test_fields(self):
+        tree = self.parse(ChunkMode.Index)
+        name = tree.find_nested(Name)
+
+        # Only the declared fields and the bytes of a chunk decode it
+        self.assertIsNone(getattr(name, '__deepcopy__', None))
+        self.assertFalse(hasattr(name, 'unknown'))
+        self.assertIn('_chunk_index', vars(name))
+        self.assertEqual(name.bytes[:4], b'NAME')
+        self.assertNotIn('_chunk_index', vars(name))
+
+        # The fields of every leaf are declared
+        eager = self.parse(ChunkMode.Eager)
+
+        for node in eager.walk():
+            if type(node) not in MshParser.Grammar and node is not eager:
+                skipped = {'chunk_name', 'chunk_length', 'bytes', 'children', 'parent', 'scope'}
+                self.assertLessEqual(set(vars(node)) - skipped, set(node.FIELDS), type(node).__name__)
+
+    def test_eager(self):
+        eager = self.parse(ChunkMode.Eager)
+        indexed = self.parse(ChunkMode.Index)
+
+        for node in indexed.walk():
+            if node is not indexed:
+                node.decode()
+
+        def state(tree: MshParser) -> list:
+            skipped = {'children', 'parent', 'scope'}
+            return [{k: v for k, v in vars(n).items() if k not in skipped} for n in tree.walk() if n is not tree]
+
+        self.assertEqual(state(indexed), state(eager))
+        self.assertEqual(indexed.hash(), eager.hash())
+        self.assertIsInstance(indexed.children[0].children[0], Mesh)
+
+    def test_walker(self):
+        # The body of SKL2 is not read by its node and the unknown chunk ends the model
+        model = chunk('MODL', chunk('MTYP', pack('<I', 3)) + chunk('UNKN', b'') + chunk('NAME', b'unknown\0'))
+        self.path.write_bytes(chunk('HEDR', chunk('SKL2', pack('<I', 0)) + chunk('MSH2', model)))
+
+        for chunks in ChunkMode.vals():
+            tree = self.parse(chunks)
+            header = tree.children[0]
+
+            self.assertEqual([node.type() for node in header.children], ['Skeleton', 'Mesh'])
+            self.assertEqual([node.type() for node in tree.find_nested(Model).children], ['ModelType'])
+            self.assertIsInstance(header.children[0], Skeleton)
+
+        self.assertEqual(MshParser.Dispatch[Model]['MTYP'], ModelType)
+
+    def test_headers(self):
+        scope = MshParser.parse_format.__globals__
+        read_header = scope['read_header']
+        names = []
+
+        def counted(stream):
+            header = read_header(stream)
+            names.append(header[0])
+            return header
+
+        # The walker passes the header of every chunk to its node, which does not read it again
+        with patch.dict(scope, read_header=counted):
+            tree = self.parse(ChunkMode.Eager)
+
+        self.assertEqual(names, ['HEDR', 'MSH2', 'MODL', 'MTYP', 'NAME', 'TRAN', 'GEOM', 'SEGM', 'POSL'])
+        self.assertEqual(tree.find_nested(Name).chunk_length, 12)
+
+    def test_mapped(self):
+        read = self.parse(ChunkMode.Eager)
+        mapped = self.parse(ChunkMode.Eager, InputMode.Map)
+        positions = mapped.find_nested(PositionVertices)
+
+        self.assertIsInstance(positions.bytes, memoryview)
+        self.assertEqual(positions.bytes, read.find_nested(PositionVertices).bytes)
+        self.assertEqual(positions.positions, [(0.0, 1.0, 2.0)])
+        self.assertEqual(mapped.hash(), read.hash())
+
+        empty = self.path.with_name('empty.msh')
+        empty.write_bytes(b'')
+        self.assertEqual(MshParser(empty, input_mode=InputMode.Map).buffer, b'')
+
+
+class MshIndexTest(TestCase):
+    # Two strips, the second triangle of the first strip is flipped and the third one is degenerate
+    STRIP = [0x8000 | 0, 0x8000 | 1, 2, 3, 3, 0x8000 | 4, 0x8000 | 5, 6]
+    TRIANGLES = [(0, 1, 2), (2, 1, 3), (4, 5, 6)]
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'unit.msh'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def parser(self, data: bytes, arrays: str = ArrayMode.List) -> MshParser:
+        self.path.write_bytes(data)
+        return MshParser(self.path, arrays=arrays)
+
+    def test_strip(self):
+        data = chunk('STRP', pack('<I8H', 8, *MshIndexTest.STRIP))
+
+        listed = Strip(self.parser(data))
+        viewed = Strip(self.parser(data, ArrayMode.View))
+
+        self.assertEqual(listed.indices, MshIndexTest.STRIP)
+        self.assertEqual(listed.triangles(), MshIndexTest.TRIANGLES)
+        self.assertEqual(viewed.triangles().tolist(), [list(t) for t in MshIndexTest.TRIANGLES])
+        self.assertEqual(Strip.triangulate(MshIndexTest.STRIP), MshIndexTest.TRIANGLES)
+
+    def test_lists(self):
+        triangles = Triangles(self.parser(chunk('NDXT', pack('<I3H', 1, 0, 1, 2) + b'\0\0')))
+        polygons = Polygons(self.parser(chunk('NDXL', pack('<IH3HH4H', 2, 3, 0, 1, 2, 4, 2, 1, 3, 4))))
+
+        self.assertEqual(triangles.triangles, [(0, 1, 2)])
+        self.assertEqual(polygons.polygons, [(0, 1, 2), (2, 1, 3, 4)])
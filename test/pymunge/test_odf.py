@@ -1,8 +1,11 @@
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
-from source.pymunge.swbf.parsers.odf import OdfParser
+from source.pymunge.swbf.parsers.odf import ENV, Key, OdfParser, Reference, Section
+from source.pymunge.swbf.parsers.parser import ParserMode
 from source.pymunge.app.registry import FileRegistry
+from source.pymunge.util.diagnostic import Diagnostic
 
 
 class OdfTest(TestCase):
@@ -11,3 +14,78 @@ class OdfTest(TestCase):
         odf = OdfParser(FileRegistry(), Path(''))
 
         self.assertTrue(odf)
+
+
+class OdfFastPathTest(TestCase):
+    ODF = str(
+        '[GameObjectClass]\n'
+        'ClassLabel      = "soldier" // label\n'
+        '// Comment after a key\n'
+        '\n'
+        '[Properties]\n'
+        '\tGeometryName = "unit.msh"\n'
+        'MaxHealth=100.0   \\\\ health\n'
+        'AimValue = 1.0 2.0\n'
+        'UnknownKey = // no value\n'
+    )
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.odf = self.path / 'unit.odf'
+
+        ENV.Diag = Diagnostic()
+        ENV.Reg = FileRegistry(self.path, self.path, diagnostic=ENV.Diag)
+
+    def tearDown(self):
+        ENV.reset()
+        self.directory.cleanup()
+
+    def parse(self, mode: str):
+        ENV.Diag.clear()
+
+        tree = OdfParser(self.odf, mode=mode).parse()
+        nodes = [(node.type(), node.raw(), node.parent.type()) for node in tree.walk() if node is not tree]
+        return tree, nodes, [(message.text, message.position) for message in ENV.Diag.messages]
+
+    def test_lines(self):
+        self.odf.write_text(OdfFastPathTest.ODF)
+
+        fast, *fast_result = self.parse(ParserMode.Fast)
+        token, *token_result = self.parse(ParserMode.Token)
+
+        self.assertFalse(fast.buffer)
+        self.assertEqual(fast_result, token_result)
+        self.assertEqual(fast.find_nested(Reference).filepath, self.path / 'unit.msh')
+
+    def test_fallback(self):
+        self.odf.write_text(OdfFastPathTest.ODF + 'TrackCenter = "0.0 1.8 0.0\nMaxSpeed = 1\n')
+
+        fast, *fast_result = self.parse(ParserMode.Fast)
+        _, *token_result = self.parse(ParserMode.Token)
+
+        self.assertTrue(fast.buffer)
+        self.assertEqual(fast_result, token_result)
+
+    def test_positions(self):
+        # Unknown keys and sections after words, numbers and line feeds at the start of the file
+        self.odf.write_text(
+            '\n'
+            '[UnknownSection] // comment\n'
+            'UnknownKey = 1.0 2\n'
+            '  Unknown_2=100 // 10\n'
+            '[ Properties ]\n'
+            'ClassLabel = "soldier"\n'
+            '\tUnknownKey3 = "value"'
+        )
+
+        fast, *fast_result = self.parse(ParserMode.Fast)
+        token, *token_result = self.parse(ParserMode.Token)
+
+        def positions(tree: OdfParser) -> list:
+            return [node.position() for node in tree.walk() if isinstance(node, (Key, Section))]
+
+        self.assertFalse(fast.buffer)
+        self.assertEqual(len(fast_result[1]), 4)
+        self.assertEqual(fast_result, token_result)
+        self.assertEqual(positions(fast), positions(token))
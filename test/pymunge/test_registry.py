@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import utime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.app.registry import FileRegistry
+from source.pymunge.util.diagnostic import Diagnostic, WarningMessage
+
+
+class UnitWarning(WarningMessage):
+
+    def __init__(self, key: str):
+        super().__init__('Key "{}" is not known', key)
+
+
+class RegistryTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+        self.req = self.path / 'level.req'
+        self.odf = self.path / 'unit.odf'
+        self.req.touch()
+        self.odf.touch()
+
+        registry = self.registry()
+        registry.register_file(self.req)
+        registry.add_link(self.req, self.odf)
+        registry.mark_munged(self.req)
+        registry.record_duration(self.req, 42)
+        registry.store_dependencies()
+        registry.store.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def registry(self) -> FileRegistry:
+        registry = FileRegistry(self.path, self.path, Diagnostic())
+        registry.load_dependencies()
+        return registry
+
+    def test_load(self):
+        registry = self.registry()
+        registry.register_file(self.req)
+
+        self.assertTrue(registry.is_up_to_date(self.req))
+        self.assertEqual(registry.registered_files[self.req].duration, 42)
+        self.assertEqual(registry.links(), [(self.req, self.odf)])
+        self.assertFalse(registry.is_up_to_date(self.odf))
+        self.assertFalse(registry.dirty)
+
+    def test_touched(self):
+        utime(self.req, (1, 1))
+
+        registry = self.registry()
+        registry.register_file(self.req)
+
+        self.assertTrue(registry.is_up_to_date(self.req))
+        self.assertIn(self.req, registry.dirty)
+
+    def test_changed(self):
+        self.req.write_bytes(b'ucft')
+
+        registry = self.registry()
+        registry.register_file(self.req)
+
+        self.assertFalse(registry.is_up_to_date(self.req))
+
+    def test_invalidate(self):
+        registry = self.registry()
+        registry.register_file(self.odf)
+
+        # The link from the req is only known to the store
+        self.assertEqual(registry.invalidate([self.odf]), [self.odf, self.req])
+        self.assertFalse(registry.is_up_to_date(self.req))
+        self.assertIn(self.req, registry.dirty)
+
+    def test_concurrent(self):
+        registry = self.registry()
+        sources = []
+
+        for i in range(64):
+            source = self.path / f'{i}.odf'
+            source.touch()
+            sources.append(source)
+
+        def link(source: Path):
+            for _ in range(8):
+                registry.add_link(source, self.odf)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(link, sources))
+
+        self.assertEqual(len(registry.links()), len(sources))
+        self.assertEqual(registry.dependents_of(self.odf), set(sources) | {self.req})
+
+    def test_diagnostics(self):
+        registry = self.registry()
+        registry.register_file(self.req)
+        registry.record_diagnostics(self.req, [UnitWarning('Scale')])
+        registry.store_dependencies()
+        registry.store.close()
+
+        registry = self.registry()
+        registry.schedule([registry.register_file(self.req).filepath])
+        messages = registry.diagnostic.messages
+
+        self.assertEqual([message.text for message in messages], ['Key "Scale" is not known'])
+        self.assertEqual(messages[0].file, self.req)
+
+    def test_relink(self):
+        # The req is munged again and no longer references the odf
+        registry = self.registry()
+        registry.register_file(self.req)
+        registry.unlink(self.req)
+        registry.mark_munged(self.req)
+        registry.store_dependencies()
+        registry.store.close()
+
+        registry = self.registry()
+        registry.register_file(self.req)
+
+        self.assertEqual(registry.links(), [])
+        self.assertEqual(registry.store.links(self.req), [])
+        self.assertEqual(registry.dependents_of(self.odf), set())
+
+    def test_invalidate_removed(self):
+        registry = self.registry()
+        registry.register_file(self.req)
+        registry.unlink(self.req)
+
+        # The stored link is outdated before the build information is written
+        self.assertEqual(registry.invalidate([self.odf]), [self.odf])
+
+        registry.store_dependencies()
+        registry.store.close()
+
+        registry = self.registry()
+        registry.register_file(self.odf)
+
+        self.assertEqual(registry.invalidate([self.odf]), [self.odf])
+        self.assertNotIn(self.req, registry.dirty)
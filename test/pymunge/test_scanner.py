@@ -0,0 +1,50 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.app.scanner import SourceScanner
+
+
+class ScannerTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+        for name in ['level.req', 'a/unit.odf', 'a/b/unit.msh', 'c/other.odf', 'c/readme.txt', 'noextension']:
+            filepath = self.path / name
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(name.encode())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_scan(self):
+        for jobs in [1, 4]:
+            buckets = SourceScanner(['odf', 'msh', 'cfg'], jobs).scan(self.path)
+
+            self.assertEqual(list(buckets['odf']), [self.path / 'a/unit.odf', self.path / 'c/other.odf'])
+            self.assertEqual(list(buckets['msh']), [self.path / 'a/b/unit.msh'])
+            self.assertEqual(buckets['cfg'], {})
+            self.assertEqual(buckets['msh'][self.path / 'a/b/unit.msh'].st_size, len('a/b/unit.msh'))
+
+    def test_split(self):
+        walked = []
+
+        class RecordingScanner(SourceScanner):
+            def walk(self, root: str, buckets=None):
+                walked.append(Path(root))
+                return SourceScanner.walk(self, root, buckets)
+
+        # A single top level directory is split below the first level
+        for i in range(8):
+            filepath = self.path / 'a' / 'sides' / f'side{i}' / 'unit.odf'
+            filepath.parent.mkdir(parents=True)
+            filepath.write_bytes(b'')
+
+        buckets = RecordingScanner(['odf'], 2).scan(self.path)
+
+        self.assertEqual(len(buckets['odf']), 10)
+        self.assertEqual(buckets, SourceScanner(['odf'], 1).scan(self.path))
+        self.assertIn(self.path / 'a' / 'sides' / 'side0', walked)
+        self.assertNotIn(self.path / 'a', walked)
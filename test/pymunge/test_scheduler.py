@@ -0,0 +1,133 @@
+from os import stat_result
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from source.pymunge.app.registry import FileRegistry
+from source.pymunge.util.diagnostic import Diagnostic
+
+
+class SchedulerTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.registry = FileRegistry(self.path, self.path, Diagnostic())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def file(self, name: str) -> Path:
+        filepath = self.path / name
+        filepath.touch()
+        self.registry.register_file(filepath)
+        return filepath
+
+    def drain(self) -> list[Path]:
+        order = []
+        while (filepath := self.registry.scheduler.get()) is not None:
+            order.append(filepath)
+            self.registry.scheduler.complete(filepath)
+        return order
+
+    def test_dependencies_first(self):
+        req = self.file('level.req')
+        odf = self.file('unit.odf')
+        msh = self.file('unit.msh')
+
+        self.registry.add_link(req, odf)
+        self.registry.add_link(odf, msh)
+
+        for filepath in [req, odf, msh]:
+            self.registry.scheduler.add(filepath)
+        self.registry.scheduler.start()
+
+        self.assertEqual(self.drain(), [msh, odf, req])
+        self.assertTrue(self.registry.scheduler.done)
+
+    def test_cycle(self):
+        a = self.file('a.odf')
+        b = self.file('b.odf')
+
+        self.registry.add_link(a, b)
+        self.registry.add_link(b, a)
+
+        self.registry.scheduler.add(a)
+        self.registry.scheduler.add(b)
+        self.registry.scheduler.start()
+
+        self.assertCountEqual(self.drain(), [a, b])
+        self.assertEqual(len(self.registry.diagnostic.messages), 1)
+
+    def test_discovered_dependency(self):
+        req = self.file('level.req')
+        odf = self.file('unit.odf')
+
+        self.registry.scheduler.add(req)
+        self.registry.scheduler.start({'odf', 'req'}, resolve_dependencies=True)
+
+        self.assertEqual(self.registry.scheduler.get(), req)
+
+        self.registry.add_link(req, odf)
+        self.registry.scheduler.complete(req)
+
+        self.assertFalse(self.registry.scheduler.done)
+        self.assertEqual(self.drain(), [odf])
+        self.assertTrue(self.registry.scheduler.done)
+
+    def test_critical_path(self):
+        short = self.file('short.odf')
+        odf = self.file('unit.odf')
+        msh = self.file('unit.msh')
+
+        self.registry.add_link(odf, msh)
+        self.registry.record_duration(short, 50)
+        self.registry.record_duration(odf, 40)
+        self.registry.record_duration(msh, 30)
+
+        for filepath in [short, odf, msh]:
+            self.registry.scheduler.add(filepath)
+        self.registry.scheduler.start()
+
+        self.assertEqual(self.drain(), [msh, short, odf])
+
+    def test_scanned_cost(self):
+        known = self.file('known.odf')
+        small = self.file('small.odf')
+        large = self.file('large.odf')
+
+        # The sizes are taken from the stat results of the scan, not from the (empty) files
+        for filepath, size in [(known, 100), (small, 10), (large, 20)]:
+            self.registry.stats[filepath] = stat_result((0, 0, 0, 0, 0, 0, size, 0, 0, 0))
+        self.registry.record_duration(known, 500)
+
+        for filepath in [small, large]:
+            self.registry.scheduler.add(filepath)
+        self.registry.scheduler.start()
+
+        self.assertEqual(self.registry.scheduler.rate, 5.0)
+        self.assertEqual(self.registry.scheduler.nodes[small].cost, 50)
+        self.assertEqual(self.registry.scheduler.nodes[large].cost, 100)
+        self.assertEqual(self.drain(), [large, small])
+
+    def test_raised_priority(self):
+        other = self.file('other.odf')
+        odf = self.file('unit.odf')
+        msh = self.file('unit.msh')
+        req = self.file('level.req')
+
+        self.registry.add_link(odf, msh)
+        self.registry.add_link(req, odf)
+
+        for filepath, duration in [(other, 200), (odf, 40), (msh, 30), (req, 1000)]:
+            self.registry.record_duration(filepath, duration)
+
+        for filepath in [other, odf, msh]:
+            self.registry.scheduler.add(filepath)
+        self.registry.scheduler.start()
+
+        # The long file which is added later raises the priority of its transitive dependency in the heap
+        self.registry.scheduler.add(req)
+
+        self.assertEqual(self.registry.scheduler.nodes[msh].priority, 1070)
+        self.assertEqual(self.drain(), [msh, odf, req, other])
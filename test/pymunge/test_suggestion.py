@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from source.pymunge.swbf.parsers.cfg import CfgParser
+from source.pymunge.swbf.parsers.sky import SkyParser
+from source.pymunge.util.diagnostic import DiagnosticMessage
+from source.pymunge.util.suggestion import SuggestionIndex, suggest_option
+
+
+class SuggestionTest(TestCase):
+    VOCABULARY = ['GeometryName', 'GeometryScale', 'ClassLabel', 'ClassParent', 'MaxHealth', 'MaxSpeed', 'Label']
+
+    def test_matches(self):
+        index = SuggestionIndex(SuggestionTest.VOCABULARY)
+
+        self.assertEqual(index.matches('GeometryNmae'), ['GeometryName', 'GeometryScale'])
+        self.assertEqual(index.matches('geometryname'), ['GeometryName', 'GeometryScale'])
+        self.assertEqual(index.matches('MaxHealht'), ['MaxHealth'])
+        self.assertEqual(index.matches('Unrelated'), [])
+        self.assertEqual(index.matches(''), [])
+
+    def test_order(self):
+        index = SuggestionIndex(SuggestionTest.VOCABULARY, n=2, cutoff=0.4)
+
+        self.assertEqual(index.matches('MaxSpeedd'), ['MaxSpeed', 'MaxHealth'])
+
+    def test_memo(self):
+        index = SuggestionIndex(SuggestionTest.VOCABULARY)
+
+        self.assertIs(index.matches('ClasLabel'), index.matches('CLASLABEL'))
+
+    def test_suggest_option(self):
+        vocabulary = tuple(SuggestionTest.VOCABULARY)
+
+        self.assertEqual(suggest_option('ClassLabl', vocabulary), 'Did you mean "ClassLabel"?')
+        self.assertEqual(suggest_option('Unrelated', vocabulary), '')
+        self.assertIs(SuggestionIndex.of(vocabulary), SuggestionIndex.of(vocabulary))
+
+    def test_unknown_call(self):
+        message = SkyParser.UnknownCall('Ambinet')
+
+        # Only the name is recorded, the suggestion is looked up in the vocabulary of the parser when formatting
+        self.assertEqual(message.args, ('Ambinet',))
+        self.assertEqual(message.triplet()[:3], 'SKY')
+        self.assertEqual(message.text, 'Call "Ambinet" is not known. Did you mean "Ambient"?')
+        self.assertEqual(DiagnosticMessage.decode(message.encode()).text, message.text)
+        self.assertEqual(CfgParser.UnknownCall('Unrelated').text, 'Call "Unrelated" is not known.')
+
+    def test_casefold(self):
+        # Only the enumerator which equals the name ignoring the case is suggested
+        self.assertEqual(suggest_option('AMBIENT', SkyParser.Call), 'Did you mean "Ambient"?')
+        self.assertEqual(suggest_option('Ambinet', SkyParser.Call), 'Did you mean "Ambient"?')
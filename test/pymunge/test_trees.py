@@ -0,0 +1,88 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from parxel.nodes import Document, LexicalNode
+from parxel.token import Token
+
+from source.pymunge.app.trees import TreeCache
+from source.pymunge.util.diagnostic import WarningMessage
+
+
+class UnitDocument(Document):
+    Version = 1
+
+    @classmethod
+    def empty(cls, filepath: Path, logger=None):
+        return cls(filepath)
+
+
+class UnitKey(LexicalNode):
+
+    def __init__(self, tokens: list[Token], basepath: Path):
+        LexicalNode.__init__(self, tokens)
+
+        self.name: str = self.raw().strip()
+        self.filepath: Path = basepath / f'{self.name}.msh'
+        self.values: list = [1, 2.5, b'\x00']
+
+
+class UnitWarning(WarningMessage):
+
+    def __init__(self, key: str):
+        super().__init__(f'Key "{key}" is not known')
+
+
+class TreeCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.source = self.path / 'unit.odf'
+        self.source.write_bytes(b'GeometryName')
+
+        self.tree = UnitDocument(self.source)
+        key = UnitKey([Token(row=2, col=8, text='Geometry'), Token(row=2, col=12, text='Name ')], self.path)
+        key.add(UnitKey([Token(text='Name')], self.path))
+        self.tree.add(key)
+        self.tree.add(UnitKey([Token(text='Scale')], self.path))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip(self):
+        cache = TreeCache(self.path / 'trees', salt='1.0')
+        key = cache.key(self.source)
+
+        self.assertIsNone(cache.load(key, self.source, UnitDocument, None))
+        cache.store(key, self.tree, [self.path / 'unit.msh'], [UnitWarning('Scale')])
+
+        tree, links, messages = cache.load(key, self.source, UnitDocument, None)
+
+        self.assertEqual(tree.dump(recursive=True), self.tree.dump(recursive=True))
+        self.assertEqual(tree.hash(), self.tree.hash())
+
+        key = tree.children[0]
+        self.assertEqual(key.parent, tree)
+        self.assertEqual(key.raw(), 'GeometryName ')
+        self.assertEqual((key.tokens[0].row, key.tokens[0].col), (2, 8))
+        self.assertEqual(key.filepath, self.path / 'GeometryName.msh')
+        self.assertEqual(key.values, [1, 2.5, b'\x00'])
+        self.assertEqual(key.children[0].name, 'Name')
+
+        self.assertEqual(links, [self.path / 'unit.msh'])
+        self.assertIsInstance(messages[0], UnitWarning)
+        self.assertEqual(messages[0].text, 'Key "Scale" is not known')
+
+    def test_relocated(self):
+        cache = TreeCache(self.path / 'trees')
+        cache.store(cache.key(self.source), self.tree, [], [])
+
+        moved = self.path / 'moved' / 'unit.odf'
+        moved.parent.mkdir()
+        moved.write_bytes(self.source.read_bytes())
+
+        tree, _, _ = cache.load(cache.key(moved), moved, UnitDocument, None)
+
+        self.assertEqual(tree.filepath, moved)
+        self.assertEqual(tree.children[0].filepath, moved.parent / 'GeometryName.msh')
@@ -0,0 +1,41 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase
+
+from source.pymunge.app.watcher import SourceWatcher
+
+
+class WatcherTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+        self.odf = self.path / 'unit.odf'
+        self.msh = self.path / 'unit.msh'
+        self.odf.write_bytes(b'odf')
+        self.msh.write_bytes(b'msh')
+
+        self.watcher = SourceWatcher(self.path, ['odf', 'msh'], interval=0.01, debounce=0.02)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_changes(self):
+        added = self.path / 'new.odf'
+        added.write_bytes(b'odf')
+        self.odf.write_bytes(b'changed')
+        self.msh.unlink()
+        (self.path / 'readme.txt').write_bytes(b'txt')
+
+        changed, removed = self.watcher.wait(Event())
+
+        self.assertEqual(set(changed), {added, self.odf})
+        self.assertEqual(removed, [self.msh])
+
+    def test_stop(self):
+        stop = Event()
+        stop.set()
+
+        self.assertIsNone(self.watcher.wait(stop))
@@ -1,6 +1,17 @@
 import unittest
 
-from test.pymunge.test_odf import OdfTest
+from test.pymunge.test_cache import BuildCacheTest
+from test.pymunge.test_diagnostic import DiagnosticTest
+from test.pymunge.test_enumeration import EnumerationTest
+from test.pymunge.test_logging import LoggingTest
+from test.pymunge.test_msh import MshArrayTest, MshChunkIndexTest, MshIndexTest
+from test.pymunge.test_odf import OdfFastPathTest, OdfTest
+from test.pymunge.test_registry import RegistryTest
+from test.pymunge.test_scanner import ScannerTest
+from test.pymunge.test_scheduler import SchedulerTest
+from test.pymunge.test_suggestion import SuggestionTest
+from test.pymunge.test_trees import TreeCacheTest
+from test.pymunge.test_watcher import WatcherTest
 
 if __name__ == '__main__':
     unittest.main()